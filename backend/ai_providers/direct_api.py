@@ -167,9 +167,15 @@ class DirectAPIProvider(AIProvider):
                     }
 
                 # Execute tool calls
+                executed = await executor.execute_tools(
+                    [
+                        {"name": block.name, "input": block.input, "id": block.id}
+                        for block in tool_use_blocks
+                    ]
+                )
                 tool_call_results = []
-                for block in tool_use_blocks:
-                    result = await executor.execute_tool(block.name, block.input)
+                for block, executed_call in zip(tool_use_blocks, executed):
+                    result = executed_call["result"]
                     tool_results.append(
                         {"tool": block.name, "input": block.input, "result": result}
                     )
@@ -218,9 +224,20 @@ class DirectAPIProvider(AIProvider):
                 # Execute tool calls
                 openai_messages.append(choice.message)
 
-                for tool_call in choice.message.tool_calls:
-                    args = json.loads(tool_call.function.arguments)
-                    result = await executor.execute_tool(tool_call.function.name, args)
+                calls = [
+                    {
+                        "name": tool_call.function.name,
+                        "input": json.loads(tool_call.function.arguments),
+                        "id": tool_call.id,
+                    }
+                    for tool_call in choice.message.tool_calls
+                ]
+                executed = await executor.execute_tools(calls)
+                for tool_call, call, executed_call in zip(
+                    choice.message.tool_calls, calls, executed
+                ):
+                    args = call["input"]
+                    result = executed_call["result"]
                     tool_results.append(
                         {
                             "tool": tool_call.function.name,
@@ -1,18 +1,45 @@
 """Test script to verify app routes"""
 
 import sys
+from functools import lru_cache
+from typing import List, Tuple
 
 sys.path.insert(0, ".")
 
-import uvicorn  # noqa: E402
 
-from main import app  # noqa: E402
+@lru_cache(maxsize=None)
+def routes() -> List[Tuple[str, str]]:
+    """
+    List the app's registered routes (imported once)
 
-print("Registered routes:")
-for route in app.routes:
-    path = getattr(route, "path", "N/A")
-    methods = getattr(route, "methods", "N/A")
-    print(f"  {path} - {methods}")
+    Returns:
+        (path, methods) of each route
+    """
+    from main import app
 
-print("\nStarting test server...")
-uvicorn.run(app, host="127.0.0.1", port=8001, log_level="info")
+    return [
+        (getattr(route, "path", "N/A"), str(getattr(route, "methods", "N/A")))
+        for route in app.routes
+    ]
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    from main import app
+
+    print("Registered routes:")
+    for path, methods in routes():
+        print(f"  {path} - {methods}")
+
+    # loop/http stay on "auto": uvicorn[standard] picks uvloop and
+    # httptools where they are installed (uvloop is not on Windows)
+    print("\nStarting test server...")
+    uvicorn.run(
+        app,
+        host="127.0.0.1",
+        port=8001,
+        log_level="info",
+        reload=False,
+        workers=1,
+    )
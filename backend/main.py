@@ -7,6 +7,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 import uvicorn
+import asyncio
 import logging
 
 from config import settings
@@ -73,6 +74,12 @@ async def startup_event():
     # Start WebSocket cleanup task
     await websocket_router.manager.start_cleanup_task()
 
+    # Open the tool executor's connection in the background; it targets this
+    # server, which only starts listening once startup has finished
+    from services.tool_executor import get_tool_executor
+
+    app.state.tool_warmup_task = asyncio.create_task(get_tool_executor().warmup())
+
     logger.info("Application started successfully")
 
 
@@ -91,6 +98,10 @@ async def shutdown_event():
     # Close tool executor HTTP client
     from services.tool_executor import get_tool_executor
 
+    # Not set if startup failed before the warmup was scheduled
+    warmup_task = getattr(app.state, "tool_warmup_task", None)
+    if warmup_task is not None:
+        warmup_task.cancel()
     await get_tool_executor().close()
 
     # Stop file watcher
@@ -129,6 +129,7 @@ async def websocket_endpoint(websocket: WebSocket):
     Message types:
     - ai_stream: Streaming AI response
     - file_changed: File modification notification
+    - files_indexed: Batch of files reindexed by the file watcher
     - completion_suggestion: Inline completion suggestion
     """
     await manager.connect(websocket)
@@ -40,10 +40,23 @@ class GitService:
         except InvalidGitRepositoryError:
             raise ValueError(f"Not a Git repository: {self.repo_path}")
 
-        # Status caching to reduce redundant git operations
+        # Status caching to reduce redundant git operations. With a file
+        # watcher attached the cache is invalidated by events and never
+        # expires; otherwise a short TTL bounds staleness.
         self._status_cache: Optional[GitStatusResponse] = None
         self._status_cache_time: float = 0
-        self._cache_ttl: float = 2.0  # 2 second TTL
+        self._status_dirty: bool = True
+        self._event_driven: bool = False
+        self._cache_ttl: float = 2.0  # 2 second TTL (no watcher attached)
+
+    def enable_event_invalidation(self) -> None:
+        """
+        Trust the status cache until invalidate_cache() is called
+
+        Call this once a file watcher is feeding filesystem events into
+        invalidate_cache("fs"); the TTL then no longer applies.
+        """
+        self._event_driven = True
 
     def get_status(self) -> GitStatusResponse:
         """
@@ -52,15 +65,14 @@ class GitService:
         Returns:
             GitStatusResponse with branch and file changes
         """
-        now = time.time()
-        if self._status_cache and (now - self._status_cache_time) < self._cache_ttl:
-            return self._status_cache
+        if self._status_cache and not self._status_dirty:
+            if self._event_driven:
+                return self._status_cache
+            if (time.time() - self._status_cache_time) < self._cache_ttl:
+                return self._status_cache
 
         # Cache miss, fetch fresh status
-        status = self._fetch_status()
-        self._status_cache = status
-        self._status_cache_time = now
-        return status
+        return self._refresh_status()
 
     def _fetch_status(self) -> GitStatusResponse:
         """
@@ -110,8 +122,16 @@ class GitService:
                     # status_code[0] = staging area (index)
                     # status_code[1] = working tree
 
+                    if status_code == "??":
+                        # Untracked files
+                        files.append(
+                            FileStatus(path=file_path, status="??", staged=False)
+                        )
+                        i += 1
+                        continue
+
                     # Add staged changes (if any)
-                    if status_code[0] != " " and status_code[0] != "?":
+                    if status_code[0] != " ":
                         files.append(
                             FileStatus(
                                 path=file_path, status=status_code[0], staged=True
@@ -125,11 +145,6 @@ class GitService:
                                 path=file_path, status=status_code[1], staged=False
                             )
                         )
-                    elif status_code == "??":
-                        # Untracked files
-                        files.append(
-                            FileStatus(path=file_path, status="??", staged=False)
-                        )
 
                     i += 1
         except GitCommandError:
@@ -140,6 +155,101 @@ class GitService:
 
         return GitStatusResponse(branch=current_branch, files=files, is_clean=is_clean)
 
+    def get_status_worktree_only(
+        self, previous: GitStatusResponse, changed_paths: List[str]
+    ) -> GitStatusResponse:
+        """
+        Refresh only the working-tree half of a previous status snapshot
+
+        Used when the index is known not to have changed: the staged entries
+        of ``previous`` are reused as-is, unstaged changes to tracked files
+        come from ``git diff`` and the untracked scan is limited to
+        ``changed_paths``.
+
+        Args:
+            previous: Last full status snapshot
+            changed_paths: Repo-relative paths touched since ``previous``
+
+        Returns:
+            GitStatusResponse with branch and file changes
+        """
+        self._status_dirty = False
+        files: List[FileStatus] = [f for f in previous.files if f.staged]
+
+        try:
+            # Unstaged changes to tracked files (index vs working tree).
+            # Unlike diff-files, diff compares content when the index's stat
+            # info is stale, so a save with identical bytes is not reported
+            diff_output = self.repo.git.diff("--name-status", "--no-renames", "-z")
+            if diff_output:
+                # Format: "M\0path\0D\0path\0..."
+                fields = diff_output.split("\0")
+                for i in range(0, len(fields) - 1, 2):
+                    status_code, file_path = fields[i], fields[i + 1]
+                    if status_code and file_path:
+                        files.append(
+                            FileStatus(
+                                path=file_path, status=status_code[0], staged=False
+                            )
+                        )
+
+            # Untracked files: carry over entries for untouched paths and
+            # re-check only the paths that changed
+            changed = set(changed_paths)
+            untracked_dirs = [
+                f.path
+                for f in previous.files
+                if f.status == "??" and f.path.endswith("/")
+            ]
+            # Changes inside a wholly untracked directory can add or remove
+            # that directory's entry: only a full status can tell
+            if any(path.startswith(d) for path in changed for d in untracked_dirs):
+                return self._refresh_status()
+            for f in previous.files:
+                if f.status == "??" and f.path not in changed:
+                    files.append(f)
+
+            if changed:
+                untracked_output = self.repo.git.ls_files(
+                    "--others",
+                    "--exclude-standard",
+                    "--directory",
+                    "--no-empty-directory",
+                    "-z",
+                    "--",
+                    *sorted(changed),
+                )
+                for file_path in untracked_output.split("\0"):
+                    if not file_path:
+                        continue
+                    # git status shows a new file in a wholly untracked
+                    # directory as that directory, which ls-files with a
+                    # file pathspec does not: leave nested paths to a full
+                    # status
+                    if "/" in file_path.rstrip("/"):
+                        return self._refresh_status()
+                    files.append(FileStatus(path=file_path, status="??", staged=False))
+        except GitCommandError:
+            # Fall back to a full refresh
+            return self._refresh_status()
+
+        status = GitStatusResponse(
+            branch=previous.branch, files=files, is_clean=len(files) == 0
+        )
+        self._status_cache = status
+        self._status_cache_time = time.time()
+        return status
+
+    def _refresh_status(self) -> GitStatusResponse:
+        """Fetch fresh status and store it in the cache"""
+        # Clear the flag before fetching so an event arriving mid-fetch
+        # marks the result stale again
+        self._status_dirty = False
+        status = self._fetch_status()
+        self._status_cache = status
+        self._status_cache_time = time.time()
+        return status
+
     def _fetch_status_fallback(self) -> List[FileStatus]:
         """
         Fallback method using GitPython API (original implementation)
@@ -183,11 +293,11 @@ class GitService:
             "checkout",
             "reset",
             "revert",
+            "fs",  # Filesystem event reported by a watcher
         }
 
         if operation in status_changing_ops or operation == "unknown":
-            self._status_cache = None
-            self._status_cache_time = 0
+            self._status_dirty = True
         # Operations like log, branches, diff don't affect status - keep cache
 
     def get_diff(self, file_path: str) -> GitDiffResponse:
@@ -238,13 +348,14 @@ class GitService:
         except GitCommandError:
             diff_text = ""
 
-        # Compress large diffs to save bandwidth
+        # Compress large diffs to save bandwidth. Gate on the character count
+        # (O(1)) rather than encoding just to measure; halving the threshold
+        # keeps it conservative for multi-byte UTF-8 content.
         diff_compressed = False
-        diff_size = len(diff_text.encode("utf-8"))
 
-        if diff_size > self.DIFF_COMPRESSION_THRESHOLD:
-            # Compress with gzip and base64 encode
-            compressed_bytes = gzip.compress(diff_text.encode("utf-8"))
+        if len(diff_text) > self.DIFF_COMPRESSION_THRESHOLD // 2:
+            # Compress with gzip (fast level) and base64 encode
+            compressed_bytes = gzip.compress(diff_text.encode("utf-8"), compresslevel=1)
             diff_text = base64.b64encode(compressed_bytes).decode("ascii")
             diff_compressed = True
 
@@ -341,15 +452,36 @@ class GitService:
         Returns:
             List of CommitInfo objects
         """
+        # Single `git log` call parsed in one pass, instead of iter_commits
+        # which builds a Commit object (and parses dates) per entry.
+        # Fields are separated by \x1f; -z terminates each record with \0.
+        # The message (%B) goes last so it may safely contain any text.
+        try:
+            output = self.repo.git.log(
+                f"-n{max_count}",
+                "--format=%H%x1f%an%x1f%ae%x1f%cI%x1f%B",
+                z=True,
+                stdout_as_string=False,
+            )
+        except GitCommandError:
+            # No commits yet (unborn branch)
+            return []
+
         commits = []
-        for commit in self.repo.iter_commits(max_count=max_count):
+        for record in output.split(b"\0"):
+            if not record:
+                continue
+            fields = record.decode("utf-8", errors="replace").split("\x1f", 4)
+            if len(fields) != 5:
+                continue
+            commit_hash, author_name, author_email, date, message = fields
             commits.append(
                 CommitInfo(
-                    hash=commit.hexsha,
-                    short_hash=commit.hexsha[:7],
-                    message=str(commit.message).strip(),
-                    author=f"{commit.author.name} <{commit.author.email}>",
-                    date=commit.committed_datetime.isoformat(),
+                    hash=commit_hash,
+                    short_hash=commit_hash[:7],
+                    message=message.strip(),
+                    author=f"{author_name} <{author_email}>",
+                    date=date,
                 )
             )
 
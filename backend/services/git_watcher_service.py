@@ -13,6 +13,7 @@ import time
 from threading import Lock
 
 from services.git_service import GitService
+from models.git_models import GitStatusResponse
 
 logger = logging.getLogger(__name__)
 
@@ -20,18 +21,28 @@ logger = logging.getLogger(__name__)
 class GitChangeHandler(FileSystemEventHandler):
     """Handler for git repository changes"""
 
-    def __init__(self, repo_path: Path, debounce_seconds: float = 0.5):
+    def __init__(
+        self,
+        repo_path: Path,
+        debounce_seconds: float = 0.5,
+        git_executor: Optional[concurrent.futures.Executor] = None,
+    ):
         """
         Initialize the git change handler
 
         Args:
             repo_path: Path to the git repository root
             debounce_seconds: Seconds to wait before processing changes
+            git_executor: Executor for blocking git calls (default: loop's)
         """
         super().__init__()
         self.repo_path = repo_path
         self.git_service = GitService(str(repo_path))
+        # Every relevant event invalidates the status cache, so it can be
+        # trusted indefinitely in between
+        self.git_service.enable_event_invalidation()
         self.debounce_seconds = debounce_seconds
+        self._git_executor = git_executor
 
         # Debouncing state
         self.last_change_time: float = 0
@@ -39,6 +50,12 @@ class GitChangeHandler(FileSystemEventHandler):
         self.lock = Lock()
         self._stopped: bool = False  # Flag to prevent broadcasts after stop
 
+        # Which kinds of change ("index" / "worktree") arrived since the last
+        # broadcast, and the repo-relative working-tree paths involved
+        self._dirty_classes: set[str] = set()
+        self._dirty_paths: set[str] = set()
+        self._last_snapshot: Optional[GitStatusResponse] = None
+
         # Callback for broadcasting changes via WebSocket (async)
         self.broadcast_callback: Optional[Callable[[dict], Awaitable[None]]] = None
         self._loop: Optional[asyncio.AbstractEventLoop] = None
@@ -66,17 +83,34 @@ class GitChangeHandler(FileSystemEventHandler):
         if event.is_directory:
             return
 
-        file_path = Path(event.src_path)
+        # Git writes index, HEAD and refs to a .lock file and renames it into
+        # place, so the destination of a move matters as much as its source
+        paths = [Path(event.src_path)]
+        dest_path = getattr(event, "dest_path", "")
+        if dest_path:
+            paths.append(Path(dest_path))
 
         # Check if this is a git-related change we care about
-        if not self._is_git_relevant(file_path):
+        relevant = [path for path in paths if self._is_git_relevant(path)]
+        if not relevant:
             return
 
+        self.git_service.invalidate_cache("fs")
+
         # Debounce: only schedule broadcast if enough time has passed
         with self.lock:
             if self._stopped:
                 return
 
+            for file_path in relevant:
+                if ".git" in file_path.parts or file_path.name == ".gitignore":
+                    # Index, HEAD, ref or ignore rule change: the staged half
+                    # and the untracked files are stale too
+                    self._dirty_classes.add("index")
+                else:
+                    self._dirty_classes.add("worktree")
+                    self._dirty_paths.add(self._relative_path(file_path))
+
             current_time = time.time()
             self.last_change_time = current_time
             self.pending_broadcast = True
@@ -100,13 +134,23 @@ class GitChangeHandler(FileSystemEventHandler):
         """
         try:
             # Check if file is inside the repo
-            file_path.relative_to(self.repo_path)
+            parts = file_path.relative_to(self.repo_path).parts
         except ValueError:
             return False
 
-        # Git index changes (.git/index)
-        if file_path.name == "index" and file_path.parent.name == ".git":
-            return True
+        # Git index, HEAD and ref changes (.git/index, .git/HEAD,
+        # .git/packed-refs, .git/refs/**): reset --soft, update-ref and
+        # branch -f move HEAD or a ref without touching the index. Ignore
+        # rules in .git/info/exclude change which files are untracked.
+        if parts and parts[0] == ".git":
+            if file_path.suffix == ".lock":
+                return False
+            return parts[1:] in (
+                ("index",),
+                ("HEAD",),
+                ("packed-refs",),
+                ("info", "exclude"),
+            ) or (len(parts) > 2 and parts[1] == "refs")
 
         # Working tree files (not in .git directory)
         if ".git" not in file_path.parts:
@@ -119,6 +163,13 @@ class GitChangeHandler(FileSystemEventHandler):
 
         return False
 
+    def _relative_path(self, file_path: Path) -> str:
+        """Convert an absolute event path to a repo-relative git path"""
+        try:
+            return file_path.relative_to(self.repo_path).as_posix()
+        except ValueError:
+            return file_path.as_posix()
+
     async def _debounced_broadcast(self):
         """Wait for debounce period, then broadcast if still pending"""
         await asyncio.sleep(self.debounce_seconds)
@@ -141,18 +192,41 @@ class GitChangeHandler(FileSystemEventHandler):
 
             # No recent changes, broadcast now
             self.pending_broadcast = False
+            dirty_classes = self._dirty_classes
+            dirty_paths = self._dirty_paths
+            self._dirty_classes = set()
+            self._dirty_paths = set()
 
         # Broadcast outside the lock
-        await self._broadcast_git_status()
+        await self._broadcast_git_status(dirty_classes, dirty_paths)
 
-    async def _broadcast_git_status(self):
+    async def _broadcast_git_status(
+        self,
+        dirty_classes: Optional[set[str]] = None,
+        dirty_paths: Optional[set[str]] = None,
+    ):
         """Fetch current git status and broadcast via WebSocket"""
         if self._stopped or not self.broadcast_callback:
             return
 
         try:
-            # Get current git status
-            status = self.git_service.get_status()
+            # Git calls block on subprocess I/O - keep them off the event loop
+            loop = asyncio.get_running_loop()
+
+            # Only working-tree files changed: the index (and so the staged
+            # half of the status) is unchanged, refresh the rest
+            if dirty_classes == {"worktree"} and self._last_snapshot is not None:
+                status = await loop.run_in_executor(
+                    self._git_executor,
+                    self.git_service.get_status_worktree_only,
+                    self._last_snapshot,
+                    sorted(dirty_paths or ()),
+                )
+            else:
+                status = await loop.run_in_executor(
+                    self._git_executor, self.git_service.get_status
+                )
+            self._last_snapshot = status
 
             # Convert to dict format for WebSocket
             message = {
@@ -176,6 +250,9 @@ class GitChangeHandler(FileSystemEventHandler):
 
         except Exception as e:
             logger.error(f"Error broadcasting git status: {e}", exc_info=True)
+            # The dirty paths of this broadcast are gone: don't build the
+            # next worktree-only refresh on a snapshot that missed them
+            self._last_snapshot = None
 
 
 class GitWatcherService:
@@ -188,6 +265,10 @@ class GitWatcherService:
         self.watching = False
         self.watched_path: Optional[Path] = None
 
+        # Git status runs here instead of on the event loop. Two workers so
+        # concurrent git subprocesses don't thrash the pack files.
+        self._git_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
     def __del__(self) -> None:
         """Ensure cleanup on garbage collection"""
         self.stop_watching()
@@ -216,7 +297,10 @@ class GitWatcherService:
             raise ValueError(f"Not a git repository: {repo_path}")
 
         # Create handler with event loop reference
-        self.handler = GitChangeHandler(watch_path)
+        self._git_executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="git-io"
+        )
+        self.handler = GitChangeHandler(watch_path, git_executor=self._git_executor)
         self.handler.set_broadcast_callback(
             broadcast_callback, asyncio.get_running_loop()
         )
@@ -230,6 +314,8 @@ class GitWatcherService:
             # Clean up on error to prevent resource leaks
             self.observer = None
             self.handler = None
+            self._git_executor.shutdown(wait=False)
+            self._git_executor = None
             raise
 
         self.watching = True
@@ -251,6 +337,10 @@ class GitWatcherService:
             finally:
                 self.observer = None
 
+        if self._git_executor:
+            self._git_executor.shutdown(wait=False, cancel_futures=True)
+            self._git_executor = None
+
         self.handler = None
         self.watching = False
         logger.info("Stopped watching git repository")
@@ -4,19 +4,105 @@ Code indexing service using ChromaDB for RAG
 
 import chromadb
 from chromadb.config import Settings as ChromaSettings
+from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+from chromadb.utils import embedding_functions
 from pathlib import Path
 import re
 from typing import List, Dict, Tuple, Optional, Pattern, Any
-import hashlib
 import json
+import msgpack
+import xxhash
 import asyncio
-import aiofiles
+import bisect
+import concurrent.futures
 import logging
+import numpy as np
+import os
+import threading
 
 from models.index_models import CodeChunk
 
 logger = logging.getLogger(__name__)
 
+# tree-sitter is optional: without it the regex chunkers are used for all files
+try:
+    from tree_sitter_languages import get_language, get_parser
+except ImportError:
+    get_language = get_parser = None
+
+
+def _combine_line_patterns(patterns: Dict[str, Pattern]) -> Pattern:
+    """
+    Combine per-line function/class patterns into one MULTILINE pattern
+
+    Whitespace and "[^)]" are kept from crossing newlines so scanning the
+    whole file matches exactly what re.match() on each line would. Group 1
+    is the function name, group 2 the class name.
+    """
+    sources = [
+        patterns[kind].pattern.replace(r"\s", r"[^\S\n]").replace("[^)]", r"[^)\n]")
+        for kind in ("function", "class")
+    ]
+    return re.compile("|".join(f"(?:{source})" for source in sources), re.MULTILINE)
+
+
+# tree-sitter parsers are not thread-safe, keep one (with its query) per thread
+_parsers = threading.local()
+
+
+class ChunkBatch:
+    """
+    Code chunks stored column-wise, in the layout collection.add() takes
+
+    Chunkers append straight into these lists, so no per-chunk dict has to
+    be built and later taken apart again before writing to ChromaDB.
+    """
+
+    __slots__ = ("documents", "metadatas", "ids")
+
+    def __init__(self) -> None:
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.ids: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def add(
+        self,
+        file_path: str,
+        chunk_type: str,
+        name: str,
+        line_start: int,
+        line_end: int,
+        content: str,
+    ) -> None:
+        """Append one chunk"""
+        # Unique ID for chunk (non-cryptographic, same width as MD5). The
+        # type is part of the key: a class and its constructor can share a
+        # name and a start line.
+        self.ids.append(
+            xxhash.xxh128_hexdigest(
+                f"{file_path}:{chunk_type}:{name}:{line_start}".encode()
+            )
+        )
+        self.documents.append(content)
+        self.metadatas.append(
+            {
+                "file_path": file_path,
+                "chunk_type": chunk_type,
+                "name": name,
+                "line_start": line_start,
+                "line_end": line_end,
+            }
+        )
+
+    def extend(self, other: "ChunkBatch") -> None:
+        """Append all chunks of another batch"""
+        self.documents.extend(other.documents)
+        self.metadatas.extend(other.metadatas)
+        self.ids.extend(other.ids)
+
 
 class CodeIndexer:
     """Service for indexing and searching code using ChromaDB"""
@@ -24,6 +110,33 @@ class CodeIndexer:
     # Supported file extensions
     SUPPORTED_EXTENSIONS = {".gd", ".cs", ".cpp", ".h", ".hpp", ".c"}
 
+    # Directories never descended into while looking for files
+    IGNORED_DIRECTORIES = frozenset({".git", ".godot", ".godot_minds", "addons"})
+
+    # Chunks accumulated across files before a single collection.add() call
+    BATCH_SIZE = 500
+
+    # Seconds to coalesce hash cache changes before writing it to disk
+    HASH_SAVE_DELAY = 1.0
+
+    # Bytes read at a time when hashing large files
+    HASH_BLOCK_SIZE = 1024 * 1024
+
+    # Files hashed/read concurrently during async indexing
+    MAX_CONCURRENT_FILES = 32
+
+    # SQLite settings for bulk ingest and the SQLite defaults they replace
+    BULK_PRAGMAS = (
+        "PRAGMA synchronous = OFF",
+        "PRAGMA journal_mode = MEMORY",
+        "PRAGMA temp_store = MEMORY",
+    )
+    DEFAULT_PRAGMAS = (
+        "PRAGMA synchronous = FULL",
+        "PRAGMA journal_mode = DELETE",
+        "PRAGMA temp_store = DEFAULT",
+    )
+
     # Pre-compiled regex patterns for chunking code (performance optimization)
     PATTERNS: Dict[str, Dict[str, Pattern]] = {
         ".gd": {
@@ -54,36 +167,71 @@ class CodeIndexer:
         },
     }
 
-    # Multiline patterns for faster parsing (captures entire function/class)
-    MULTILINE_PATTERNS: Dict[str, Dict[str, Pattern]] = {
-        ".gd": {
-            "functions": re.compile(
-                r"^(func\s+(\w+)\s*\([^)]*\):.*?)(?=^func\s+|\Z)",
+    # PATTERNS combined per extension for a single pass over the whole file
+    LINE_PATTERNS: Dict[str, Pattern] = {
+        ext: _combine_line_patterns(patterns) for ext, patterns in PATTERNS.items()
+    }
+
+    # Chunk terminators for the line-based chunker
+    _BLANK_LINE = re.compile(r"^\s*$", re.MULTILINE)
+    _UNINDENTED_LINE = re.compile(r"^[^ \t\n]", re.MULTILINE)
+
+    # tree-sitter grammar per extension (GDScript has no bundled grammar and
+    # stays on the regex chunkers)
+    TREE_SITTER_LANGUAGES: Dict[str, str] = {
+        ".cpp": "cpp",
+        ".hpp": "cpp",
+        ".h": "cpp",
+        ".c": "c",
+        ".cs": "c_sharp",
+    }
+
+    # Syntax node types indexed as chunks, by chunk_type
+    TREE_SITTER_NODE_TYPES: Dict[str, str] = {
+        "function_definition": "function",
+        "method_declaration": "function",
+        "constructor_declaration": "function",
+        "class_specifier": "class",
+        "struct_specifier": "class",
+        "class_declaration": "class",
+        "struct_declaration": "class",
+        "interface_declaration": "class",
+    }
+
+    # Multiline patterns capturing whole functions ("func"/"fname") and
+    # classes ("cls"/"cname"). For .gd/.py one scan finds both: the bodies
+    # are captured inside a zero-width lookahead so a class chunk can still
+    # contain the functions found in it. The .cpp bodies are matched brace
+    # by brace and a class match would consume the functions after it (e.g.
+    # the lazy body of a "class Foo;" forward declaration), so .cpp keeps a
+    # separate scan for each.
+    COMBINED_PATTERNS: Dict[str, Tuple[Pattern, ...]] = {
+        ".gd": (
+            re.compile(
+                r"^(?=(?P<func>func\s+(?P<fname>\w+)\s*\([^)]*\):.*?)(?=^func\s+|\Z))"
+                r"|^(?=(?P<cls>class\s+(?P<cname>\w+)\s*:.*?)(?=^class\s+|\Z))",
                 re.MULTILINE | re.DOTALL,
             ),
-            "classes": re.compile(
-                r"^(class\s+(\w+)\s*:.*?)(?=^class\s+|\Z)", re.MULTILINE | re.DOTALL
-            ),
-        },
-        ".py": {
-            "functions": re.compile(
-                r"^(def\s+(\w+)\s*\([^)]*\):.*?)(?=^def\s+|^class\s+|\Z)",
+        ),
+        ".py": (
+            re.compile(
+                r"^(?=(?P<func>def\s+(?P<fname>\w+)\s*\([^)]*\):.*?)"
+                r"(?=^def\s+|^class\s+|\Z))"
+                r"|^(?=(?P<cls>class\s+(?P<cname>\w+).*?)(?=^class\s+|\Z))",
                 re.MULTILINE | re.DOTALL,
             ),
-            "classes": re.compile(
-                r"^(class\s+(\w+).*?)(?=^class\s+|\Z)", re.MULTILINE | re.DOTALL
-            ),
-        },
-        ".cpp": {
-            "functions": re.compile(
-                r"^(\w+\s+(\w+)\s*\([^)]*\)\s*\{(?:[^{}]|\{[^{}]*\})*\})",
+        ),
+        ".cpp": (
+            re.compile(
+                r"^(?P<func>\w+\s+(?P<fname>\w+)\s*\([^)]*\)\s*"
+                r"\{(?:[^{}]|\{[^{}]*\})*\})",
                 re.MULTILINE | re.DOTALL,
             ),
-            "classes": re.compile(
-                r"^(class\s+(\w+).*?\{(?:[^{}]|\{[^{}]*\})*\};)",
+            re.compile(
+                r"^(?P<cls>class\s+(?P<cname>\w+).*?\{(?:[^{}]|\{[^{}]*\})*\};)",
                 re.MULTILINE | re.DOTALL,
             ),
-        },
+        ),
     }
 
     def __init__(self, persist_directory: str = ".godot_minds/index"):
@@ -102,14 +250,35 @@ class CodeIndexer:
             settings=ChromaSettings(anonymized_telemetry=False, allow_reset=True),
         )
 
+        # Embeddings are computed by us in whole batches (see _flush_pending);
+        # the collection uses the same function for queries
+        embedding_function = embedding_functions.DefaultEmbeddingFunction()
+        if embedding_function is None:
+            # Thin clients (chromadb-client) ship without a local model
+            raise RuntimeError("ChromaDB has no local embedding function")
+        self.embedding_function: EmbeddingFunction[Documents] = embedding_function
+
         # Get or create collection
         self.collection = self.client.get_or_create_collection(
-            name="code_chunks", metadata={"description": "Code chunks for RAG"}
+            name="code_chunks",
+            metadata={"description": "Code chunks for RAG"},
+            embedding_function=self.embedding_function,  # type: ignore[arg-type]
         )
 
-        # File hash cache for incremental indexing
-        self._file_hashes: Dict[str, str] = {}
+        # File metadata cache for incremental indexing:
+        # rel_path -> {"size": int, "mtime_ns": int, "xxh3": str (optional)}
+        self._file_hashes: Dict[str, Dict[str, Any]] = {}
         self._load_file_hashes()
+        self._hashes_lock = threading.Lock()
+        self._hashes_save_timer: Optional[threading.Timer] = None
+
+        # Pending chunks not yet written to ChromaDB (see _queue_chunks)
+        self._pending = ChunkBatch()
+        self._pending_lock = threading.Lock()
+
+        # Embeddings of the previous index, reused during a force reindex:
+        # (content digest -> row, embedding matrix)
+        self._reusable_embeddings: Optional[Tuple[Dict[bytes, int], np.ndarray]] = None
 
     def index_project(
         self, project_path: str, force_reindex: bool = False
@@ -125,40 +294,72 @@ class CodeIndexer:
             Tuple of (files_indexed, chunks_created)
         """
         if force_reindex:
-            # Delete collection and recreate it
-            try:
-                self.client.delete_collection("code_chunks")
-            except Exception:
-                pass
-            self.collection = self.client.create_collection(
-                name="code_chunks", metadata={"description": "Code chunks for RAG"}
-            )
+            # Recreate the collection, keeping embeddings of unchanged chunks
+            self._snapshot_embeddings()
+            self.clear_index()
 
         project_dir = Path(project_path).resolve()
         files_indexed = 0
         chunks_created = 0
 
-        for ext in self.SUPPORTED_EXTENSIONS:
-            for file_path in project_dir.rglob(f"*{ext}"):
-                # Skip ignored directories
-                if any(
-                    part in [".git", ".godot", ".godot_minds", "addons"]
-                    for part in file_path.parts
-                ):
-                    continue
+        def flush() -> None:
+            nonlocal files_indexed, chunks_created
+            files_lost, chunks_lost = self._flush_pending()
+            files_indexed -= files_lost
+            chunks_created -= chunks_lost
 
+        self._set_bulk_pragmas(True)
+        try:
+            for file_path in self._find_files(project_dir, self.SUPPORTED_EXTENSIONS):
                 try:
                     chunks = self._chunk_file(file_path, project_dir)
-                    if chunks:
-                        self._add_chunks_to_index(chunks)
-                        files_indexed += 1
-                        chunks_created += len(chunks)
                 except Exception as e:
                     print(f"Error indexing {file_path}: {e}")
+                    continue
+                if chunks:
+                    files_indexed += 1
+                    chunks_created += len(chunks)
+                    if self._queue_chunks(chunks) >= self.BATCH_SIZE:
+                        flush()
+
+            flush()
+        finally:
+            self._set_bulk_pragmas(False)
+            self._reusable_embeddings = None
 
         return files_indexed, chunks_created
 
-    def _chunk_file(self, file_path: Path, project_root: Path) -> List[Dict]:
+    def _set_bulk_pragmas(self, enable: bool) -> None:
+        """
+        Switch ChromaDB's SQLite connection into (or out of) bulk-ingest mode
+
+        Bulk mode skips fsync and keeps the rollback journal in memory, so a
+        crash or power loss mid-index can corrupt the index. That is
+        acceptable here because the index can always be rebuilt from source
+        with force_reindex. Exclusive locking is deliberately not used since
+        search requests share the database from other threads.
+
+        ChromaDB keeps one connection per thread, so this only affects the
+        calling thread; the caller must run its writes on the same thread.
+
+        Args:
+            enable: True for bulk-ingest settings, False to restore defaults
+        """
+        sysdb = getattr(getattr(self.client, "_server", None), "_sysdb", None)
+        conn_pool = getattr(sysdb, "_conn_pool", None)
+        if conn_pool is None:
+            logger.warning("ChromaDB SQLite connection not found, skipping pragmas")
+            return
+
+        pragmas = self.BULK_PRAGMAS if enable else self.DEFAULT_PRAGMAS
+        try:
+            conn = conn_pool.connect()
+            for pragma in pragmas:
+                conn.execute(pragma)
+        except Exception as e:
+            logger.warning(f"Could not set SQLite pragmas: {e}")
+
+    def _chunk_file(self, file_path: Path, project_root: Path) -> ChunkBatch:
         """
         Chunk a file into functions/classes or whole file
 
@@ -167,148 +368,254 @@ class CodeIndexer:
             project_root: Root directory of the project
 
         Returns:
-            List of chunk dictionaries
+            Batch of code chunks
         """
         try:
-            # Use read_text for synchronous operations (indexing is already in background)
-            # For async contexts, use aiofiles in the caller
+            # Synchronous read (indexing is already in background)
+            # For async contexts, use _chunk_file_async
             content = file_path.read_text(encoding="utf-8")
         except Exception as e:
             logger.error(f"Error reading {file_path}: {e}")
-            return []
+            return ChunkBatch()
 
-        ext = file_path.suffix
+        return self._chunk_content(content, file_path, project_root)
 
-        # Use multiline patterns if available for better performance
-        if ext in self.MULTILINE_PATTERNS:
-            return self._process_file_content_multiline(
-                content, file_path, project_root
-            )
-
-        # Fallback to line-by-line processing
-        relative_path = str(file_path.relative_to(project_root))
-
-        # Get patterns for this file type
-        patterns = self.PATTERNS.get(ext, {})
-
-        chunks = []
-        lines = content.split("\n")
-
-        # Try to find functions/classes
-        current_chunk = None
-        current_lines = []
-
-        for i, line in enumerate(lines):
-            # Check for function
-            if "function" in patterns:
-                match = patterns["function"].match(line)
-                if match:
-                    # Save previous chunk
-                    if current_chunk:
-                        chunks.append(current_chunk)
-
-                    # Start new function chunk
-                    current_chunk = {
-                        "file_path": relative_path,
-                        "chunk_type": "function",
-                        "name": match.group(1),
-                        "line_start": i + 1,
-                        "lines": [line],
-                    }
-                    current_lines = [line]
-                    continue
+    def _chunk_content(
+        self, content: str, file_path: Path, project_root: Path
+    ) -> ChunkBatch:
+        """
+        Chunk file content with the best chunker available for its type
 
-            # Check for class
-            if "class" in patterns:
-                match = patterns["class"].match(line)
-                if match:
-                    # Save previous chunk
-                    if current_chunk:
-                        chunks.append(current_chunk)
-
-                    # Start new class chunk
-                    current_chunk = {
-                        "file_path": relative_path,
-                        "chunk_type": "class",
-                        "name": match.group(1),
-                        "line_start": i + 1,
-                        "lines": [line],
-                    }
-                    current_lines = [line]
-                    continue
+        Args:
+            content: File content
+            file_path: Path to the file
+            project_root: Root directory of the project
 
-            # Add line to current chunk
-            if current_chunk:
-                current_lines.append(line)
+        Returns:
+            Batch of code chunks
+        """
+        ext = file_path.suffix
 
-                # End chunk on empty line or significant indentation decrease (heuristic)
-                if not line.strip() or (
-                    len(current_lines) > 5 and not line.startswith((" ", "\t"))
-                ):
-                    current_chunk["content"] = "\n".join(current_lines)
-                    current_chunk["line_end"] = i + 1
-                    chunks.append(current_chunk)
-                    current_chunk = None
-                    current_lines = []
-
-        # Add last chunk
-        if current_chunk:
-            current_chunk["content"] = "\n".join(current_lines)
-            current_chunk["line_end"] = len(lines)
-            chunks.append(current_chunk)
+        # Prefer a real parser, then multiline patterns, then line-based
+        if get_parser is not None and ext in self.TREE_SITTER_LANGUAGES:
+            chunks = self._process_file_content_tree_sitter(
+                content, file_path, project_root
+            )
+        elif ext in self.COMBINED_PATTERNS:
+            chunks = self._process_file_content_multiline(
+                content, file_path, project_root
+            )
+        else:
+            chunks = self._process_file_content(content, file_path, project_root)
 
         # If no chunks found, index entire file
         if not chunks:
-            chunks.append(
-                {
-                    "file_path": relative_path,
-                    "chunk_type": "file",
-                    "name": file_path.name,
-                    "line_start": 1,
-                    "line_end": len(lines),
-                    "content": content,
-                }
+            chunks.add(
+                str(file_path.relative_to(project_root)),
+                "file",
+                file_path.name,
+                1,
+                content.count("\n") + 1,
+                content,
             )
 
         return chunks
 
-    def _add_chunks_to_index(self, chunks: List[Dict]) -> None:
+    def _add_chunks_to_index(self, chunks: ChunkBatch) -> None:
         """
-        Add code chunks to ChromaDB
+        Add code chunks to ChromaDB immediately
 
         Args:
-            chunks: List of chunk dictionaries
+            chunks: Batch of code chunks
         """
         if not chunks:
             return
 
-        documents = []
-        metadatas = []
-        ids = []
-
-        for chunk in chunks:
-            # Create unique ID for chunk
-            chunk_id = hashlib.md5(
-                f"{chunk['file_path']}:{chunk.get('name', '')}:{chunk['line_start']}".encode()
-            ).hexdigest()
-
-            documents.append(chunk["content"])
-            metadatas.append(
-                {
-                    "file_path": chunk["file_path"],
-                    "chunk_type": chunk["chunk_type"],
-                    "name": chunk.get("name", ""),
-                    "line_start": chunk["line_start"],
-                    "line_end": chunk["line_end"],
-                }
+        self._queue_chunks(chunks)
+        self._flush_pending()
+
+    def _replace_files_chunks(self, files: Dict[str, ChunkBatch]) -> int:
+        """
+        Replace files' chunks in ChromaDB, embedding only what changed
+
+        All files are read, deleted from and written in single calls. Chunks
+        whose ID and content are already indexed are left alone, and chunks
+        that no longer exist in their file are deleted.
+
+        Args:
+            files: File path relative to the project root -> all current
+                chunks of that file
+
+        Returns:
+            Number of chunks written (new or changed)
+        """
+        if not files:
+            return 0
+
+        paths = list(files)
+        where: Dict[str, Any] = (
+            {"file_path": paths[0]}
+            if len(paths) == 1
+            else {"file_path": {"$in": paths}}
+        )
+        existing = self.collection.get(where=where, include=["documents"])
+        indexed = dict(zip(existing["ids"], existing["documents"] or []))
+
+        changed = ChunkBatch()
+        current_ids = set()
+        for chunks in files.values():
+            current_ids.update(chunks.ids)
+            for document, metadata, chunk_id in zip(
+                chunks.documents, chunks.metadatas, chunks.ids
+            ):
+                if indexed.get(chunk_id) != document:
+                    changed.documents.append(document)
+                    changed.metadatas.append(metadata)
+                    changed.ids.append(chunk_id)
+
+        stale = set(indexed).difference(current_ids)
+        if stale:
+            self.collection.delete(ids=list(stale))
+        if changed:
+            self.collection.upsert(
+                documents=changed.documents,
+                embeddings=self._embed_documents(changed.documents),
+                metadatas=changed.metadatas,  # type: ignore[arg-type]
+                ids=changed.ids,
             )
-            ids.append(chunk_id)
+        return len(changed)
+
+    def _queue_chunks(self, chunks: ChunkBatch) -> int:
+        """
+        Queue code chunks for the next batched write to ChromaDB
+
+        Args:
+            chunks: Batch of code chunks
+
+        Returns:
+            Number of chunks now pending
+        """
+        with self._pending_lock:
+            self._pending.extend(chunks)
+            return len(self._pending)
+
+    def _take_pending(self) -> ChunkBatch:
+        """Detach and return all queued chunks"""
+        with self._pending_lock:
+            pending = self._pending
+            self._pending = ChunkBatch()
+            return pending
+
+    def _embed_documents(self, documents: List[str]) -> Embeddings:
+        """
+        Embed documents in one batched model call
+
+        Documents found in the force-reindex snapshot reuse their previous
+        embedding; only the rest go through the model.
+
+        Args:
+            documents: Chunk contents
+
+        Returns:
+            One embedding per document
+        """
+        snapshot = self._reusable_embeddings
+        if snapshot is None:
+            return self.embedding_function(documents)
+
+        rows, matrix = snapshot
+        embeddings: List[Any] = [None] * len(documents)
+        missing: List[int] = []
+        for index, document in enumerate(documents):
+            row = rows.get(xxhash.xxh128_digest(document.encode()))
+            if row is None:
+                missing.append(index)
+            else:
+                embeddings[index] = matrix[row].tolist()
+
+        if missing:
+            computed = self.embedding_function([documents[i] for i in missing])
+            for index, embedding in zip(missing, computed):
+                embeddings[index] = embedding
+        return embeddings
+
+    def _snapshot_embeddings(self) -> None:
+        """Keep the current collection's embeddings for _embed_documents to reuse"""
+        self._reusable_embeddings = None
+        try:
+            existing = self.collection.get(include=["documents", "embeddings"])
+        except Exception as e:
+            logger.warning(f"Could not snapshot embeddings: {e}")
+            return
+
+        documents = existing.get("documents") or []
+        embeddings = existing.get("embeddings") or []
+        if not documents or len(documents) != len(embeddings):
+            return
+
+        # Keyed by content: an embedding only depends on the chunk text
+        rows = {
+            xxhash.xxh128_digest(document.encode()): row
+            for row, document in enumerate(documents)
+        }
+        self._reusable_embeddings = (rows, np.asarray(embeddings, dtype=np.float32))
+        logger.info(f"Reusing up to {len(rows)} embeddings for reindex")
 
-        # Add to collection
+    def _write_batch(self, batch: ChunkBatch, embeddings: Embeddings) -> None:
+        """
+        Write chunks with precomputed embeddings to ChromaDB
+
+        Args:
+            batch: Chunks to write
+            embeddings: Embeddings from _embed_documents, in batch order
+        """
         self.collection.add(
-            documents=documents, metadatas=metadatas, ids=ids  # type: ignore[arg-type]
+            documents=batch.documents,
+            embeddings=embeddings,
+            metadatas=batch.metadatas,  # type: ignore[arg-type]
+            ids=batch.ids,
         )
 
+    def _flush_pending(self) -> Tuple[int, int]:
+        """
+        Write all queued chunks to ChromaDB in a single add() call
+
+        Returns:
+            Tuple of (files, chunks) lost to a failed write (see _batch_failed)
+        """
+        pending = self._take_pending()
+        if not pending:
+            return 0, 0
+        try:
+            self._write_batch(pending, self._embed_documents(pending.documents))
+        except Exception as e:
+            return self._batch_failed(pending, e)
+        return 0, 0
+
+    def _batch_failed(self, batch: ChunkBatch, error: Exception) -> Tuple[int, int]:
+        """
+        Log a batch that could not be embedded or written
+
+        A batch holds whole files from many chunkers, so the error is
+        reported against all of them. Their cached hashes are dropped so the
+        next incremental run indexes them again.
+
+        Args:
+            batch: Chunks that were not written
+            error: Exception raised while embedding or writing them
+
+        Returns:
+            Tuple of (files, chunks) lost
+        """
+        file_paths = sorted({metadata["file_path"] for metadata in batch.metadatas})
+        logger.error(
+            f"Error writing {len(batch)} chunks from {len(file_paths)} files "
+            f"({', '.join(file_paths)}): {error}"
+        )
+        for file_path in file_paths:
+            self._file_hashes.pop(file_path, None)
+        return len(file_paths), len(batch)
+
     def search(
         self, query: str, max_results: int = 5, file_types: Optional[List[str]] = None
     ) -> List[CodeChunk]:
@@ -380,7 +687,7 @@ class CodeIndexer:
             # Remove from hash cache
             if relative_path in self._file_hashes:
                 del self._file_hashes[relative_path]
-                self._save_file_hashes()
+                self._schedule_save_file_hashes()
 
             logger.info(f"Removed file from index: {relative_path}")
 
@@ -394,7 +701,9 @@ class CodeIndexer:
         except Exception:
             pass
         self.collection = self.client.create_collection(
-            name="code_chunks", metadata={"description": "Code chunks for RAG"}
+            name="code_chunks",
+            metadata={"description": "Code chunks for RAG"},
+            embedding_function=self.embedding_function,  # type: ignore[arg-type]
         )
 
     def get_stats(self) -> Dict:
@@ -403,32 +712,112 @@ class CodeIndexer:
         return {"total_chunks": count, "persist_directory": str(self.persist_directory)}
 
     def _load_file_hashes(self):
-        """Load file hash cache from disk"""
-        hash_file = self.persist_directory / "file_hashes.json"
-        if hash_file.exists():
-            try:
-                with open(hash_file, "r") as f:
-                    self._file_hashes = json.load(f)
-            except Exception as e:
-                logger.warning(f"Could not load file hashes: {e}")
-                self._file_hashes = {}
+        """Load file hash cache from disk (msgpack, or legacy JSON)"""
+        hash_file = self.persist_directory / "file_hashes.msgpack"
+        legacy_file = self.persist_directory / "file_hashes.json"
+        try:
+            if hash_file.exists():
+                with open(hash_file, "rb") as f:
+                    data = msgpack.unpackb(f.read())
+            elif legacy_file.exists():
+                with open(legacy_file, "r") as f:
+                    data = json.load(f)
+            else:
+                return
+            # Drop entries from the old SHA-256-only format; those files
+            # are re-hashed once on the next index
+            self._file_hashes = {
+                path: entry for path, entry in data.items() if isinstance(entry, dict)
+            }
+        except Exception as e:
+            logger.warning(f"Could not load file hashes: {e}")
+            self._file_hashes = {}
+
+    def _schedule_save_file_hashes(self):
+        """Save the hash cache after HASH_SAVE_DELAY, coalescing bursts of changes"""
+        with self._hashes_lock:
+            if self._hashes_save_timer is None:
+                self._hashes_save_timer = threading.Timer(
+                    self.HASH_SAVE_DELAY, self._save_file_hashes
+                )
+                self._hashes_save_timer.start()
 
     def _save_file_hashes(self):
         """Save file hash cache to disk"""
-        hash_file = self.persist_directory / "file_hashes.json"
+        with self._hashes_lock:
+            if self._hashes_save_timer is not None:
+                self._hashes_save_timer.cancel()
+                self._hashes_save_timer = None
+            # dict() copies atomically, so indexing threads can keep updating
+            data = msgpack.packb(dict(self._file_hashes))
+
+        hash_file = self.persist_directory / "file_hashes.msgpack"
         try:
-            with open(hash_file, "w") as f:
-                json.dump(self._file_hashes, f)
+            with open(hash_file, "wb") as f:
+                f.write(data)
         except Exception as e:
             logger.error(f"Could not save file hashes: {e}")
 
     def _compute_file_hash(self, file_path: Path) -> str:
-        """Compute SHA256 hash of file"""
-        hasher = hashlib.sha256()
+        """Compute XXH3-64 of file (change detection only, not cryptographic)"""
+        # XXH3 uses SSE2/AVX2/NEON where available: faster than XXH64 on both
+        # small sources and large files
+        # Plain reads, not mmap: a mapped file truncated by an editor while
+        # it is being hashed raises SIGBUS and kills the process
+        hasher = xxhash.xxh3_64()
         with open(file_path, "rb") as f:
-            hasher.update(f.read())
+            if os.fstat(f.fileno()).st_size <= self.HASH_BLOCK_SIZE:
+                hasher.update(f.read())
+            else:
+                # Large files are hashed through one reused buffer
+                buffer = bytearray(self.HASH_BLOCK_SIZE)
+                view = memoryview(buffer)
+                while size := f.readinto(buffer):
+                    hasher.update(view[:size])
         return hasher.hexdigest()
 
+    def _update_file_hash(
+        self, file_path: Path, rel_path: str, verify_content: bool = False
+    ) -> bool:
+        """
+        Refresh the cached entry for a file
+
+        Only size and mtime are compared by default, so unchanged files are
+        never read. With verify_content, files whose metadata differs are
+        also hashed, and a touched-but-identical file is not reported.
+
+        Args:
+            file_path: Path to the file
+            rel_path: Path relative to the project root (cache key)
+            verify_content: Hash the file content when metadata differs
+
+        Returns:
+            True if the file changed since it was last cached
+        """
+        stat = file_path.stat()
+        entry = self._file_hashes.get(rel_path)
+        if (
+            entry is not None
+            and entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return False
+
+        if not verify_content:
+            self._file_hashes[rel_path] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+            }
+            return True
+
+        file_hash = self._compute_file_hash(file_path)
+        self._file_hashes[rel_path] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "xxh3": file_hash,
+        }
+        return entry is None or entry.get("xxh3") != file_hash
+
     def _find_files(
         self, project_dir: Path, extensions: set, max_files: int = 10000
     ) -> List[Path]:
@@ -443,17 +832,15 @@ class CodeIndexer:
         Returns:
             List of file paths
         """
-        all_files = []
-        for ext in extensions:
-            for file_path in project_dir.rglob(f"*{ext}"):
-                # Skip ignored directories
-                if any(
-                    part in [".git", ".godot", ".godot_minds", "addons"]
-                    for part in file_path.parts
-                ):
+        # Single tree walk, pruning ignored directories before descending
+        all_files: List[Path] = []
+        for dirpath, dirnames, filenames in os.walk(project_dir):
+            dirnames[:] = [d for d in dirnames if d not in self.IGNORED_DIRECTORIES]
+            for filename in filenames:
+                if os.path.splitext(filename)[1] not in extensions:
                     continue
 
-                all_files.append(file_path)
+                all_files.append(Path(dirpath, filename))
                 if len(all_files) >= max_files:
                     logger.warning(f"Hit max file limit ({max_files}), stopping search")
                     return all_files
@@ -461,7 +848,7 @@ class CodeIndexer:
 
     async def _chunk_file_async(
         self, file_path: Path, project_root: Path
-    ) -> List[Dict]:
+    ) -> ChunkBatch:
         """
         Async version of _chunk_file
 
@@ -470,27 +857,128 @@ class CodeIndexer:
             project_root: Root directory of the project
 
         Returns:
-            List of chunk dictionaries
+            Batch of code chunks
         """
         try:
-            async with aiofiles.open(file_path, mode="r", encoding="utf-8") as f:
-                content = await f.read()
+            # One thread hop for open+read (aiofiles needs one per call)
+            content = await asyncio.to_thread(file_path.read_text, encoding="utf-8")
         except Exception as e:
             logger.error(f"Error reading {file_path}: {e}")
-            return []
+            return ChunkBatch()
 
-        # CPU-bound processing - use multiline if available for better performance
-        ext = file_path.suffix
-        if ext in self.MULTILINE_PATTERNS:
-            return self._process_file_content_multiline(
-                content, file_path, project_root
+        # CPU-bound processing
+        return self._chunk_content(content, file_path, project_root)
+
+    def _process_file_content_tree_sitter(
+        self, content: str, file_path: Path, project_root: Path
+    ) -> ChunkBatch:
+        """
+        Process file content by querying a tree-sitter syntax tree
+
+        Unlike the regex patterns this handles arbitrarily nested braces.
+        Classes and the methods inside them are both emitted as chunks.
+
+        Args:
+            content: File content
+            file_path: Path to the file
+            project_root: Root directory of the project
+
+        Returns:
+            Batch of code chunks (empty if none were found)
+        """
+        relative_path = str(file_path.relative_to(project_root))
+        parser, query = self._tree_sitter_parser(
+            self.TREE_SITTER_LANGUAGES[file_path.suffix]
+        )
+
+        source = content.encode("utf-8")
+        tree = parser.parse(source)
+
+        # The query runs in C, so only chunk nodes ever reach Python.
+        # Captures come out in source order, classes before their methods.
+        chunks = ChunkBatch()
+        for node, chunk_type in query.captures(tree.root_node):
+            chunks.add(
+                relative_path,
+                chunk_type,
+                self._tree_sitter_node_name(node, source),
+                node.start_point[0] + 1,
+                node.end_point[0] + 1,
+                source[node.start_byte : node.end_byte].decode(
+                    "utf-8", errors="replace"
+                ),
             )
+
+        return chunks
+
+    def _tree_sitter_parser(self, language: str) -> Tuple[Any, Any]:
+        """
+        Get this thread's parser and chunk query for a tree-sitter language
+
+        The query captures each TREE_SITTER_NODE_TYPES node the grammar has,
+        named by its chunk_type. Requiring a body skips forward declarations
+        such as "class Foo;".
+        """
+        tools = getattr(_parsers, language, None)
+        if tools is None:
+            grammar = get_language(language)
+            node_types = {
+                grammar.node_kind_for_id(i) for i in range(grammar.node_kind_count)
+            }
+            query = grammar.query(
+                "\n".join(
+                    f"({node_type} body: (_)) @{chunk_type}"
+                    for node_type, chunk_type in self.TREE_SITTER_NODE_TYPES.items()
+                    if node_type in node_types
+                )
+            )
+            tools = (get_parser(language), query)
+            setattr(_parsers, language, tools)
+        return tools
+
+    @staticmethod
+    def _tree_sitter_node_name(node: Any, source: bytes) -> str:
+        """
+        Get the declared name of a function/class syntax node
+
+        Classes carry a "name" field; C/C++ functions nest the name inside
+        declarators (pointer_declarator -> function_declarator -> identifier).
+        """
+        name_node = node.child_by_field_name("name")
+        if name_node is None:
+            name_node = node.child_by_field_name("declarator")
+            while name_node is not None:
+                inner = name_node.child_by_field_name("declarator")
+                if inner is None:
+                    break
+                name_node = inner
+        if name_node is None:
+            return ""
+        return source[name_node.start_byte : name_node.end_byte].decode(
+            "utf-8", errors="replace"
+        )
+
+    @staticmethod
+    def _line_starts(content: str) -> List[int]:
+        """
+        Offsets at which each line of content begins
+
+        bisect.bisect_right(line_starts, pos) gives the 1-based line number
+        of any offset without rescanning the text before it.
+        """
+        # Scan for newlines in one vectorized pass. UTF-32 keeps one array
+        # element per character, so offsets stay valid str indices.
+        if content.isascii():
+            codes = np.frombuffer(content.encode("ascii"), dtype=np.uint8)
         else:
-            return self._process_file_content(content, file_path, project_root)
+            codes = np.frombuffer(content.encode("utf-32-le"), dtype=np.uint32)
+        newlines = np.flatnonzero(codes == 0x0A)
+        newlines += 1
+        return [0] + newlines.tolist()
 
     def _process_file_content_multiline(
         self, content: str, file_path: Path, project_root: Path
-    ) -> List[Dict]:
+    ) -> ChunkBatch:
         """
         Process file content using multiline regex for better performance
 
@@ -500,81 +988,47 @@ class CodeIndexer:
             project_root: Root directory of the project
 
         Returns:
-            List of chunk dictionaries
+            Batch of code chunks (empty if none were found)
         """
         ext = file_path.suffix
         relative_path = str(file_path.relative_to(project_root))
 
-        # Get multiline patterns for this file type
-        patterns = self.MULTILINE_PATTERNS.get(ext, {})
-
-        chunks: List[Dict[str, Any]] = []
-        lines = content.split("\n")
-
-        # Find all functions at once using multiline regex
-        if "functions" in patterns:
-            for match in patterns["functions"].finditer(content):
-                function_content = match.group(1)
-                function_name = match.group(2)
-
-                # Calculate line numbers
-                start_pos = match.start(1)
-                line_start = content[:start_pos].count("\n") + 1
-                line_end = line_start + function_content.count("\n")
+        line_starts = self._line_starts(content)
 
-                chunks.append(
-                    {
-                        "file_path": relative_path,
-                        "chunk_type": "function",
-                        "name": function_name,
-                        "line_start": line_start,
-                        "line_end": line_end,
-                        "content": function_content.strip(),
-                        "lines": [],  # Not needed with multiline
-                    }
-                )
+        # Find all functions and classes, one multiline regex pass per pattern
+        functions = ChunkBatch()
+        classes = ChunkBatch()
+        for pattern in self.COMBINED_PATTERNS.get(ext, ()):
+            has_func = "func" in pattern.groupindex
+            for match in pattern.finditer(content):
+                if has_func and match.group("func") is not None:
+                    group, name_group, chunk_type = "func", "fname", "function"
+                    target = functions
+                else:
+                    group, name_group, chunk_type = "cls", "cname", "class"
+                    target = classes
 
-        # Find all classes at once using multiline regex
-        if "classes" in patterns:
-            for match in patterns["classes"].finditer(content):
-                class_content = match.group(1)
-                class_name = match.group(2)
+                chunk_content = match.group(group)
 
                 # Calculate line numbers
-                start_pos = match.start(1)
-                line_start = content[:start_pos].count("\n") + 1
-                line_end = line_start + class_content.count("\n")
-
-                chunks.append(
-                    {
-                        "file_path": relative_path,
-                        "chunk_type": "class",
-                        "name": class_name,
-                        "line_start": line_start,
-                        "line_end": line_end,
-                        "content": class_content.strip(),
-                        "lines": [],  # Not needed with multiline
-                    }
+                line_start = bisect.bisect_right(line_starts, match.start(group))
+                line_end = line_start + chunk_content.count("\n")
+
+                target.add(
+                    relative_path,
+                    chunk_type,
+                    match.group(name_group),
+                    line_start,
+                    line_end,
+                    chunk_content.strip(),
                 )
 
-        # If no chunks found, index entire file
-        if not chunks:
-            chunks.append(
-                {
-                    "file_path": relative_path,
-                    "chunk_type": "file",
-                    "name": file_path.name,
-                    "line_start": 1,
-                    "line_end": len(lines),
-                    "content": content,
-                }
-            )
-
-        return chunks
+        functions.extend(classes)
+        return functions
 
     def _process_file_content(
         self, content: str, file_path: Path, project_root: Path
-    ) -> List[Dict]:
+    ) -> ChunkBatch:
         """
         Process file content into chunks (CPU-bound, called from async)
 
@@ -584,91 +1038,68 @@ class CodeIndexer:
             project_root: Root directory of the project
 
         Returns:
-            List of chunk dictionaries
+            Batch of code chunks (empty if none were found)
         """
         ext = file_path.suffix
         relative_path = str(file_path.relative_to(project_root))
 
-        # Get patterns for this file type
-        patterns = self.PATTERNS.get(ext, {})
-
-        chunks = []
-        lines = content.split("\n")
-
-        # Try to find functions/classes
-        current_chunk = None
-        current_lines = []
-
-        for i, line in enumerate(lines):
-            # Check for function
-            if "function" in patterns:
-                match = patterns["function"].match(line)
-                if match:
-                    # Save previous chunk
-                    if current_chunk:
-                        chunks.append(current_chunk)
-
-                    # Start new function chunk
-                    current_chunk = {
-                        "file_path": relative_path,
-                        "chunk_type": "function",
-                        "name": match.group(1),
-                        "line_start": i + 1,
-                        "lines": [line],
-                    }
-                    current_lines = [line]
-                    continue
-
-            # Check for class
-            if "class" in patterns:
-                match = patterns["class"].match(line)
-                if match:
-                    # Save previous chunk
-                    if current_chunk:
-                        chunks.append(current_chunk)
-
-                    # Start new class chunk
-                    current_chunk = {
-                        "file_path": relative_path,
-                        "chunk_type": "class",
-                        "name": match.group(1),
-                        "line_start": i + 1,
-                        "lines": [line],
-                    }
-                    current_lines = [line]
-                    continue
-
-            # Add line to current chunk
-            if current_chunk:
-                current_lines.append(line)
-
-                # End chunk on empty line or significant indentation decrease (heuristic)
-                if not line.strip() or (
-                    len(current_lines) > 5 and not line.startswith((" ", "\t"))
-                ):
-                    current_chunk["content"] = "\n".join(current_lines)
-                    current_chunk["line_end"] = i + 1
-                    chunks.append(current_chunk)
-                    current_chunk = None
-                    current_lines = []
-
-        # Add last chunk
-        if current_chunk:
-            current_chunk["content"] = "\n".join(current_lines)
-            current_chunk["line_end"] = len(lines)
-            chunks.append(current_chunk)
+        # Get combined line pattern for this file type
+        pattern = self.LINE_PATTERNS.get(ext)
+
+        chunks = ChunkBatch()
+        line_starts = self._line_starts(content)
+
+        # Find all function/class header lines in one pass
+        headers: List[Tuple[int, str, str]] = []
+        if pattern is not None:
+            for match in pattern.finditer(content):
+                line = bisect.bisect_right(line_starts, match.start()) - 1
+                if match.group(1) is not None:
+                    headers.append((line, "function", match.group(1)))
+                else:
+                    headers.append((line, "class", match.group(2)))
+
+        for index, (line, chunk_type, name) in enumerate(headers):
+            # A chunk runs until the next header at the latest...
+            next_header = (
+                headers[index + 1][0] if index + 1 < len(headers) else len(line_starts)
+            )
+            stop = (
+                line_starts[next_header]
+                if next_header < len(line_starts)
+                else len(content)
+            )
+            last = next_header - 1
+
+            # ...but ends earlier on an empty line, or on an unindented line
+            # once it is more than 5 lines long (heuristic)
+            if line + 1 < next_header:
+                blank = self._BLANK_LINE.search(content, line_starts[line + 1], stop)
+                if blank and blank.start() < stop:
+                    last = min(
+                        last, bisect.bisect_right(line_starts, blank.start()) - 1
+                    )
+            if line + 5 < next_header:
+                unindented = self._UNINDENTED_LINE.search(
+                    content, line_starts[line + 5], stop
+                )
+                if unindented:
+                    last = min(
+                        last, bisect.bisect_right(line_starts, unindented.start()) - 1
+                    )
 
-        # If no chunks found, index entire file
-        if not chunks:
-            chunks.append(
-                {
-                    "file_path": relative_path,
-                    "chunk_type": "file",
-                    "name": file_path.name,
-                    "line_start": 1,
-                    "line_end": len(lines),
-                    "content": content,
-                }
+            end_pos = (
+                line_starts[last + 1] - 1
+                if last + 1 < len(line_starts)
+                else len(content)
+            )
+            chunks.add(
+                relative_path,
+                chunk_type,
+                name,
+                line + 1,
+                last + 1,
+                content[line_starts[line] : end_pos],
             )
 
         return chunks
@@ -679,6 +1110,7 @@ class CodeIndexer:
         force_reindex: bool = False,
         incremental: bool = True,
         max_files: int = 10000,
+        verify_content: bool = False,
     ) -> Tuple[int, int]:
         """
         Async version of index_project with incremental support
@@ -688,19 +1120,16 @@ class CodeIndexer:
             force_reindex: If True, clear existing index first
             incremental: If True, only index changed files
             max_files: Maximum files to index
+            verify_content: Hash files whose size/mtime changed and skip those
+                with identical content (default: trust metadata alone)
 
         Returns:
             Tuple of (files_indexed, chunks_created)
         """
         if force_reindex:
-            # Delete collection and recreate it
-            try:
-                self.client.delete_collection("code_chunks")
-            except Exception:
-                pass
-            self.collection = self.client.create_collection(
-                name="code_chunks", metadata={"description": "Code chunks for RAG"}
-            )
+            # Recreate the collection, keeping embeddings of unchanged chunks
+            await asyncio.to_thread(self._snapshot_embeddings)
+            self.clear_index()
             self._file_hashes.clear()
 
         project_dir = Path(project_path).resolve()
@@ -710,38 +1139,103 @@ class CodeIndexer:
             self._find_files, project_dir, self.SUPPORTED_EXTENSIONS, max_files
         )
 
-        # Determine which files need indexing
-        files_to_index = []
+        # Bound concurrent reads to avoid exhausting file descriptors
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_FILES)
+
+        async def update_hash(file_path: Path) -> bool:
+            rel_path = str(file_path.relative_to(project_dir))
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self._update_file_hash, file_path, rel_path, verify_content
+                )
+
+        async def chunk_file(file_path: Path) -> ChunkBatch:
+            async with semaphore:
+                try:
+                    return await self._chunk_file_async(file_path, project_dir)
+                except Exception as e:
+                    logger.error(f"Error indexing {file_path}: {e}", exc_info=True)
+                    return ChunkBatch()
+
+        # Determine which files need indexing (hashes updated for all files)
+        changed = await asyncio.gather(*(update_hash(p) for p in all_files))
         if incremental and not force_reindex:
-            for file_path in all_files:
-                file_hash = self._compute_file_hash(file_path)
-                rel_path = str(file_path.relative_to(project_dir))
-
-                # Only index if hash changed
-                if self._file_hashes.get(rel_path) != file_hash:
-                    files_to_index.append(file_path)
-                    self._file_hashes[rel_path] = file_hash
+            # Only index files that changed
+            files_to_index = [p for p, c in zip(all_files, changed) if c]
         else:
             files_to_index = all_files
-            # Update all hashes
-            for file_path in all_files:
-                file_hash = self._compute_file_hash(file_path)
-                rel_path = str(file_path.relative_to(project_dir))
-                self._file_hashes[rel_path] = file_hash
 
-        # Index files
+        # Index files, chunking concurrently. All ChromaDB writes go through
+        # one thread so the bulk pragmas apply to (and are restored on) the
+        # connection they use. Chunking continues while batches are embedded
+        # and written, and one batch's embedding overlaps the previous write.
         chunks_created = 0
-        for file_path in files_to_index:
+        files_lost = 0
+        loop = asyncio.get_running_loop()
+        flushes: List[asyncio.Task] = []
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="index-writer"
+        ) as writer:
+
+            async def flush(
+                batch: ChunkBatch, previous: Optional[asyncio.Task]
+            ) -> Tuple[int, int]:
+                # A failed batch is logged and counted, not raised, so the
+                # rest of the project still gets indexed
+                try:
+                    embeddings = (
+                        await asyncio.to_thread(self._embed_documents, batch.documents)
+                        if batch
+                        else []
+                    )
+                    if previous is not None:
+                        await previous
+                    if batch:
+                        await loop.run_in_executor(
+                            writer, self._write_batch, batch, embeddings
+                        )
+                except Exception as e:
+                    return self._batch_failed(batch, e)
+                return 0, 0
+
+            def count_lost(lost: Tuple[int, int]) -> None:
+                nonlocal files_lost, chunks_created
+                files_lost += lost[0]
+                chunks_created -= lost[1]
+
+            def start_flush():
+                previous = flushes[-1] if flushes else None
+                flushes.append(
+                    asyncio.ensure_future(flush(self._take_pending(), previous))
+                )
+
+            await loop.run_in_executor(writer, self._set_bulk_pragmas, True)
             try:
-                chunks = await self._chunk_file_async(file_path, project_dir)
-                if chunks:
-                    # Add to index (blocking, run in thread)
-                    await asyncio.to_thread(self._add_chunks_to_index, chunks)
-                    chunks_created += len(chunks)
-            except Exception as e:
-                logger.error(f"Error indexing {file_path}: {e}", exc_info=True)
+                for next_chunks in asyncio.as_completed(
+                    [chunk_file(p) for p in files_to_index]
+                ):
+                    chunks = await next_chunks
+                    if chunks:
+                        chunks_created += len(chunks)
+                        # Write to index in batches (blocking, run in thread)
+                        if self._queue_chunks(chunks) >= self.BATCH_SIZE:
+                            # Bound memory to two batches in flight
+                            if len(flushes) >= 2:
+                                count_lost(await flushes.pop(0))
+                            start_flush()
+
+                start_flush()
+                for lost in await asyncio.gather(*flushes):
+                    count_lost(lost)
+            finally:
+                # Don't leave flushes running against a closed writer on error
+                for task in flushes:
+                    task.cancel()
+                await loop.run_in_executor(writer, self._set_bulk_pragmas, False)
+                self._reusable_embeddings = None
 
         # Save file hashes
         self._save_file_hashes()
 
-        return len(files_to_index), chunks_created
+        return len(files_to_index) - files_lost, chunks_created
@@ -6,7 +6,8 @@ to enable delta updates that only send changes since last request.
 """
 
 import time
-from typing import Dict, Optional, TYPE_CHECKING
+from collections import OrderedDict
+from typing import Optional, Tuple, TYPE_CHECKING
 
 if TYPE_CHECKING:
     from models.git_models import GitStatusResponse
@@ -16,10 +17,15 @@ class SessionManager:
     """Manages client sessions for delta updates with TTL expiration."""
 
     SESSION_TTL = 300  # 5 minutes
+    SESSION_TTL_NS = SESSION_TTL * 1_000_000_000
     MAX_SESSIONS = 1000  # Prevent unbounded memory growth
 
     def __init__(self) -> None:
-        self._sessions: Dict[str, dict] = {}
+        # client_id -> (status, monotonic_ns of last update), ordered oldest
+        # update first so expiry and eviction work from the front
+        self._sessions: "OrderedDict[str, Tuple[GitStatusResponse, int]]" = (
+            OrderedDict()
+        )
 
     def get_cached_status(self, client_id: str) -> Optional["GitStatusResponse"]:
         """
@@ -32,14 +38,15 @@ class SessionManager:
             Cached GitStatusResponse or None if expired/missing
         """
         session = self._sessions.get(client_id)
-        if not session:
+        if session is None:
             return None
 
-        if time.time() - session["timestamp"] > self.SESSION_TTL:
+        status, timestamp = session
+        if time.monotonic_ns() - timestamp > self.SESSION_TTL_NS:
             del self._sessions[client_id]
             return None
 
-        return session.get("status")
+        return status
 
     def update_cache(self, client_id: str, status: "GitStatusResponse") -> None:
         """
@@ -49,20 +56,15 @@ class SessionManager:
             client_id: Unique identifier for the client
             status: Current git status to cache
         """
-        # Cleanup if approaching limit to prevent memory issues
-        if len(self._sessions) >= self.MAX_SESSIONS:
+        if client_id in self._sessions:
+            self._sessions.move_to_end(client_id)
+        elif len(self._sessions) >= self.MAX_SESSIONS:
+            # Cleanup if at limit, then evict the least recently updated
             self.cleanup_expired()
-            # If still over limit after cleanup, remove oldest sessions
-            if len(self._sessions) >= self.MAX_SESSIONS:
-                sorted_sessions = sorted(
-                    self._sessions.items(), key=lambda x: x[1]["timestamp"]
-                )
-                # Remove oldest 10%
-                to_remove = max(1, len(sorted_sessions) // 10)
-                for key, _ in sorted_sessions[:to_remove]:
-                    del self._sessions[key]
-
-        self._sessions[client_id] = {"status": status, "timestamp": time.time()}
+            while len(self._sessions) >= self.MAX_SESSIONS:
+                self._sessions.popitem(last=False)
+
+        self._sessions[client_id] = (status, time.monotonic_ns())
 
     def cleanup_expired(self) -> int:
         """
@@ -71,15 +73,16 @@ class SessionManager:
         Returns:
             Count of sessions removed
         """
-        now = time.time()
-        expired = [
-            k
-            for k, v in self._sessions.items()
-            if now - v["timestamp"] > self.SESSION_TTL
-        ]
-        for key in expired:
-            del self._sessions[key]
-        return len(expired)
+        cutoff = time.monotonic_ns() - self.SESSION_TTL_NS
+        removed = 0
+        # Sessions are in update order: stop at the first one still alive
+        while self._sessions:
+            _, timestamp = next(iter(self._sessions.values()))
+            if timestamp >= cutoff:
+                break
+            self._sessions.popitem(last=False)
+            removed += 1
+        return removed
 
     def get_session_count(self) -> int:
         """Get current number of active sessions."""
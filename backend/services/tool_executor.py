@@ -2,11 +2,13 @@
 Tool Executor - Handles AI tool calls for Godot editor operations
 """
 
-import json
+import asyncio
 import logging
-from typing import Any, Dict, List, Optional
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Optional
 from pathlib import Path
 import httpx
+import orjson
 
 logger = logging.getLogger(__name__)
 
@@ -16,31 +18,17 @@ _TOOLS_PATH = (
 )
 _godot_tools: List[Dict[str, Any]] = []
 
+# Provider-format tool payloads, built once when the tools are loaded and
+# shared by every request (callers must not mutate them)
+_anthropic_tools: List[Dict[str, Any]] = []
+_openai_tools: List[Dict[str, Any]] = []
 
-def load_godot_tools() -> List[Dict[str, Any]]:
-    """Load Godot tool definitions from JSON file"""
-    global _godot_tools
-
-    if _godot_tools:
-        return _godot_tools
-
-    try:
-        with open(_TOOLS_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            _godot_tools = data.get("tools", [])
-            logger.info(f"Loaded {len(_godot_tools)} Godot editor tools")
-    except FileNotFoundError:
-        logger.warning(f"Godot tools file not found: {_TOOLS_PATH}")
-    except json.JSONDecodeError as e:
-        logger.error(f"Failed to parse Godot tools JSON: {e}")
-
-    return _godot_tools
 
+def _build_provider_tools(tools: List[Dict[str, Any]]) -> None:
+    """Precompute the Anthropic and OpenAI tool payloads"""
+    global _anthropic_tools, _openai_tools
 
-def get_tools_for_anthropic() -> List[Dict[str, Any]]:
-    """Convert tool definitions to Anthropic format"""
-    tools = load_godot_tools()
-    return [
+    _anthropic_tools = [
         {
             "name": tool["name"],
             "description": tool["description"],
@@ -48,12 +36,7 @@ def get_tools_for_anthropic() -> List[Dict[str, Any]]:
         }
         for tool in tools
     ]
-
-
-def get_tools_for_openai() -> List[Dict[str, Any]]:
-    """Convert tool definitions to OpenAI function calling format"""
-    tools = load_godot_tools()
-    return [
+    _openai_tools = [
         {
             "type": "function",
             "function": {
@@ -66,47 +49,130 @@ def get_tools_for_openai() -> List[Dict[str, Any]]:
     ]
 
 
-# Map tool names to editor endpoints
-_TOOL_TO_ENDPOINT: Dict[str, tuple[str, str]] = {
-    # Node operations
-    "godot_create_node": ("POST", "/editor/node/create"),
-    "godot_delete_node": ("POST", "/editor/node/delete"),
-    "godot_set_property": ("POST", "/editor/property/set"),
-    "godot_get_property": ("POST", "/editor/property/get"),
-    # Resource operations
-    "godot_attach_resource": ("POST", "/editor/resource/attach"),
-    "godot_create_resource": ("POST", "/editor/resource/create"),
-    # Scene operations
-    "godot_get_scene_tree": ("GET", "/editor/scene/tree"),
-    "godot_instantiate_scene": ("POST", "/editor/scene/instantiate"),
-    "godot_save_scene": ("POST", "/editor/scene/save"),
-    # Script operations
-    "godot_attach_script": ("POST", "/editor/script/attach"),
-    "godot_connect_signal": ("POST", "/editor/signal/connect"),
-    # Selection
-    "godot_get_selection": ("GET", "/editor/selection"),
-    # Undo
-    "godot_undo": ("POST", "/editor/undo"),
-    # Procedural placement
-    "godot_spawn_grid": ("POST", "/editor/spawn/grid"),
-    "godot_spawn_random": ("POST", "/editor/spawn/random"),
-    "godot_spawn_path": ("POST", "/editor/spawn/path"),
-}
+def load_godot_tools() -> List[Dict[str, Any]]:
+    """Load Godot tool definitions from JSON file"""
+    global _godot_tools
+
+    if _godot_tools:
+        return _godot_tools
+
+    try:
+        with open(_TOOLS_PATH, "rb") as f:
+            data = orjson.loads(f.read())
+        tools = data.get("tools", [])
+        _build_provider_tools(tools)
+        _godot_tools = tools
+        logger.info(f"Loaded {len(_godot_tools)} Godot editor tools")
+    except FileNotFoundError:
+        logger.warning(f"Godot tools file not found: {_TOOLS_PATH}")
+    except orjson.JSONDecodeError as e:
+        logger.error(f"Failed to parse Godot tools JSON: {e}")
+
+    return _godot_tools
+
+
+def get_tools_for_anthropic() -> List[Dict[str, Any]]:
+    """Get tool definitions in Anthropic format"""
+    load_godot_tools()
+    return _anthropic_tools
+
+
+def get_tools_for_openai() -> List[Dict[str, Any]]:
+    """Get tool definitions in OpenAI function calling format"""
+    load_godot_tools()
+    return _openai_tools
+
+
+# Map tool names to editor endpoints (read-only; paths are relative to the
+# client's base_url)
+_TOOL_TO_ENDPOINT: Mapping[str, tuple[str, str]] = MappingProxyType(
+    {
+        # Node operations
+        "godot_create_node": ("POST", "/editor/node/create"),
+        "godot_delete_node": ("POST", "/editor/node/delete"),
+        "godot_set_property": ("POST", "/editor/property/set"),
+        "godot_get_property": ("POST", "/editor/property/get"),
+        # Resource operations
+        "godot_attach_resource": ("POST", "/editor/resource/attach"),
+        "godot_create_resource": ("POST", "/editor/resource/create"),
+        # Scene operations
+        "godot_get_scene_tree": ("GET", "/editor/scene/tree"),
+        "godot_instantiate_scene": ("POST", "/editor/scene/instantiate"),
+        "godot_save_scene": ("POST", "/editor/scene/save"),
+        # Script operations
+        "godot_attach_script": ("POST", "/editor/script/attach"),
+        "godot_connect_signal": ("POST", "/editor/signal/connect"),
+        # Selection
+        "godot_get_selection": ("GET", "/editor/selection"),
+        # Undo
+        "godot_undo": ("POST", "/editor/undo"),
+        # Procedural placement
+        "godot_spawn_grid": ("POST", "/editor/spawn/grid"),
+        "godot_spawn_random": ("POST", "/editor/spawn/random"),
+        "godot_spawn_path": ("POST", "/editor/spawn/path"),
+    }
+)
+
+# Headers for request bodies serialized with orjson
+_JSON_HEADERS = {"content-type": "application/json"}
+
+# Tools that only read editor state and may run concurrently. Every other
+# tool is a barrier: later calls may depend on what it changed.
+_READ_ONLY_TOOLS = frozenset(
+    {"godot_get_property", "godot_get_scene_tree", "godot_get_selection"}
+)
 
 
 class ToolExecutor:
     """Execute AI tool calls by forwarding to editor endpoints"""
 
-    def __init__(self, base_url: str = "http://127.0.0.1:8005"):
+    def __init__(self, base_url: str = "http://127.0.0.1:8005", max_workers: int = 10):
         self.base_url = base_url
         self._client: Optional[httpx.AsyncClient] = None
+        # Caps tool requests in flight at once
+        self._semaphore = asyncio.Semaphore(max_workers)
 
     async def _get_client(self) -> httpx.AsyncClient:
         """Get or create HTTP client"""
         if self._client is None or self._client.is_closed:
-            self._client = httpx.AsyncClient(timeout=30.0)
+            # One persistent client so concurrent tool calls share kept-alive
+            # connections. HTTP/2 is only negotiated over TLS (ALPN); the
+            # default loopback editor endpoint stays on HTTP/1.1 keep-alive.
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=httpx.Timeout(30.0, connect=5.0),
+                # Retry once on connection failure (e.g. a dropped keep-alive)
+                transport=httpx.AsyncHTTPTransport(
+                    http2=self.base_url.startswith("https://"),
+                    limits=httpx.Limits(
+                        max_connections=10,
+                        max_keepalive_connections=10,
+                        keepalive_expiry=60.0,
+                    ),
+                    retries=1,
+                ),
+            )
         return self._client
 
+    async def warmup(self, attempts: int = 3, delay: float = 0.5):
+        """
+        Create the HTTP client and open a connection before the first tool call
+
+        Failures are ignored: the endpoint may not be listening yet.
+
+        Args:
+            attempts: Connection attempts before giving up
+            delay: Seconds between attempts
+        """
+        client = await self._get_client()
+        for attempt in range(attempts):
+            try:
+                await client.get("/health")
+                return
+            except httpx.HTTPError as e:
+                logger.debug(f"Tool executor warmup attempt {attempt + 1} failed: {e}")
+                await asyncio.sleep(delay)
+
     async def close(self):
         """Close HTTP client"""
         if self._client and not self._client.is_closed:
@@ -126,22 +192,24 @@ class ToolExecutor:
         Returns:
             Result from the editor endpoint
         """
-        if tool_name not in _TOOL_TO_ENDPOINT:
+        entry = _TOOL_TO_ENDPOINT.get(tool_name)
+        if entry is None:
             return {"error": f"Unknown tool: {tool_name}"}
 
-        method, endpoint = _TOOL_TO_ENDPOINT[tool_name]
-        url = f"{self.base_url}{endpoint}"
+        method, endpoint = entry
 
         try:
             client = await self._get_client()
 
             if method == "GET":
-                response = await client.get(url, params=tool_input)
+                response = await client.get(endpoint, params=tool_input)
             else:
-                response = await client.post(url, json=tool_input)
+                response = await client.post(
+                    endpoint, content=orjson.dumps(tool_input), headers=_JSON_HEADERS
+                )
 
             response.raise_for_status()
-            result = response.json()
+            result = orjson.loads(response.content)
 
             logger.info(f"Tool {tool_name} executed successfully: {result}")
             return result
@@ -157,31 +225,66 @@ class ToolExecutor:
             logger.error(error_msg)
             return {"error": error_msg}
 
+    async def _execute_bounded(
+        self, tool_name: str, tool_input: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Execute a tool call, converting unexpected errors to error results"""
+        try:
+            async with self._semaphore:
+                return await self.execute_tool(tool_name, tool_input)
+        except Exception as e:
+            logger.error(f"Tool {tool_name} raised: {e}", exc_info=True)
+            return {"error": f"Tool {tool_name} failed: {str(e)}"}
+
     async def execute_tools(
         self, tool_calls: List[Dict[str, Any]]
     ) -> List[Dict[str, Any]]:
         """
-        Execute multiple tool calls in sequence
+        Execute multiple tool calls, running independent ones concurrently
+
+        Consecutive read-only calls run together; calls that modify the
+        editor run on their own, in order, so later calls see their effects.
 
         Args:
             tool_calls: List of tool call dicts with "name" and "input" keys
 
         Returns:
-            List of results
+            List of results, in the order of tool_calls
         """
-        results = []
-        for call in tool_calls:
-            tool_name = call.get("name", "")
-            tool_input = call.get("input", {})
-            result = await self.execute_tool(tool_name, tool_input)
-            results.append(
-                {
-                    "tool_name": tool_name,
-                    "tool_use_id": call.get("id", ""),
-                    "result": result,
-                }
+        raw: List[Dict[str, Any]] = []
+        group: List[Dict[str, Any]] = []
+
+        async def run_group():
+            raw.extend(
+                await asyncio.gather(
+                    *(
+                        self._execute_bounded(
+                            call.get("name", ""), call.get("input", {})
+                        )
+                        for call in group
+                    )
+                )
             )
-        return results
+            group.clear()
+
+        for call in tool_calls:
+            if call.get("name", "") in _READ_ONLY_TOOLS:
+                group.append(call)
+                continue
+            # Reads queued before a modification must see the old state
+            await run_group()
+            group.append(call)
+            await run_group()
+        await run_group()
+
+        return [
+            {
+                "tool_name": call.get("name", ""),
+                "tool_use_id": call.get("id", ""),
+                "result": result,
+            }
+            for call, result in zip(tool_calls, raw)
+        ]
 
 
 # Singleton instance
@@ -3,222 +3,404 @@ File watcher service using Watchdog to monitor code changes
 """
 
 from watchdog.observers import Observer
+from watchdog.observers.api import BaseObserver
 from watchdog.events import (
+    EVENT_TYPE_CREATED,
+    EVENT_TYPE_DELETED,
     FileSystemEventHandler,
 )
 from pathlib import Path
-from typing import Callable, Optional, Awaitable
+from typing import Callable, Optional, Awaitable, Dict, List, Tuple
 import time
 import threading
 import asyncio
+import concurrent.futures
 import logging
+import os
+import sys
 from collections import OrderedDict
-from datetime import datetime
 
 from config import settings
-from services.indexer_service import CodeIndexer
+from services.indexer_service import ChunkBatch, CodeIndexer
 
 logger = logging.getLogger(__name__)
 
+# Directory events that can add or remove a repository (.git)
+_REPO_EVENT_TYPES = frozenset({EVENT_TYPE_CREATED, EVENT_TYPE_DELETED})
+
+
+def _create_observer() -> BaseObserver:
+    """
+    Create the OS-native (kernel notification) observer for this platform
+
+    Observer() picks the same backends, but silently degrades to polling the
+    whole tree when they fail; choosing explicitly makes that visible.
+    """
+    try:
+        if sys.platform.startswith("linux"):
+            from watchdog.observers.inotify import InotifyObserver
+
+            return InotifyObserver(generate_full_events=False)
+        if sys.platform == "darwin":
+            from watchdog.observers.fsevents import FSEventsObserver
+
+            return FSEventsObserver()
+        if sys.platform == "win32":
+            from watchdog.observers.read_directory_changes import WindowsApiObserver
+
+            return WindowsApiObserver()
+    except Exception as e:
+        logger.warning(f"Native file observer unavailable, falling back: {e}")
+    return Observer()
+
 
 class CodeFileHandler(FileSystemEventHandler):
     """Handler for code file changes"""
 
-    def __init__(self, indexer: CodeIndexer, debounce_seconds: float = 0.5):
+    def __init__(
+        self,
+        indexer: CodeIndexer,
+        debounce_seconds: float = 0.5,
+        max_delay: float = 5.0,
+    ):
         """
         Initialize the file handler
 
         Args:
             indexer: CodeIndexer instance to update
-            debounce_seconds: Seconds to wait before processing changes
+            debounce_seconds: Seconds without any change before pending
+                changes are processed
+            max_delay: Longest a change waits to be processed while changes
+                keep arriving
         """
         super().__init__()
         self.indexer = indexer
         self.debounce_seconds = debounce_seconds
+        self.max_delay = max_delay
+
+        # Precomputed for allocation-free filtering of raw event paths
+        self._watch_extensions = tuple(settings.watch_extensions)
+        self._ignored_fragments = tuple(
+            f"{os.sep}{directory}{os.sep}" for directory in settings.ignore_directories
+        )
 
-        # Track pending changes with timestamps (bounded with LRU eviction)
-        self.pending_changes: OrderedDict[str, float] = OrderedDict()
+        # (path, monotonic timestamp) of each change, coalesced by the
+        # debounce task; created on the event loop by start()
+        self._queue: Optional["asyncio.Queue[Tuple[str, float]]"] = None
+        self._debounce_task: Optional[asyncio.Task] = None
         self.max_pending = 1000  # Limit to prevent unbounded growth
-        self.lock = threading.Lock()
-        self.change_event = threading.Event()
 
         # Callback for broadcasting changes via WebSocket (async)
         self.broadcast_callback: Optional[Callable[[dict], Awaitable[None]]] = None
         self._loop: Optional[asyncio.AbstractEventLoop] = None
 
-        # Start debounce processor thread
-        self.running = True
-        self.processor_thread = threading.Thread(
-            target=self._process_pending_changes, daemon=True
+        # Directory -> project root it belongs to (bounded with LRU eviction)
+        self._root_cache: OrderedDict[Path, Path] = OrderedDict()
+        self._root_cache_size = 256
+        self._root_cache_lock = threading.Lock()
+
+        # Reindexes each debounced batch of files in parallel (see start())
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+
+    async def start(self):
+        """Start debouncing changes on the running event loop"""
+        self.stop()
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=os.cpu_count(), thread_name_prefix="reindex"
         )
-        self.processor_thread.start()
+        self._debounce_task = asyncio.create_task(self._debounce_changes())
 
     def set_broadcast_callback(self, callback: Callable):
         """Set callback function to broadcast file changes"""
         self.broadcast_callback = callback
 
-    def on_modified(self, event):
-        """Handle file modification events"""
+    def dispatch(self, event):
+        """
+        Filter events once, before they reach the on_* handlers
+
+        Directory events are only used to notice repositories appearing or
+        disappearing; file events for unwatched files are dropped here.
+        """
         if event.is_directory:
+            created_or_deleted = event.event_type in _REPO_EVENT_TYPES
+            if created_or_deleted and os.path.basename(event.src_path) == ".git":
+                self._clear_root_cache()
             return
 
-        file_path = Path(event.src_path)
-        if self._should_process_file(file_path):
-            self._add_pending_change(str(file_path))
+        if self._should_process_file(event.src_path):
+            super().dispatch(event)
+
+    def on_modified(self, event):
+        """Handle file modification events"""
+        self._add_pending_change(event.src_path)
 
     def on_created(self, event):
         """Handle file creation events"""
-        if event.is_directory:
-            return
-
-        file_path = Path(event.src_path)
-        if self._should_process_file(file_path):
-            self._add_pending_change(str(file_path))
+        self._add_pending_change(event.src_path)
 
     def on_deleted(self, event):
         """Handle file deletion events"""
-        if event.is_directory:
-            return
-
         file_path = Path(event.src_path)
-        if self._should_process_file(file_path):
-            # Find project root (simplified for this implementation)
-            project_root = file_path.parent
-            while project_root.parent != project_root:
-                if (project_root / ".git").exists():
-                    break
-                project_root = project_root.parent
+        project_root = self._find_project_root(file_path)
+        self.indexer.remove_file(file_path, project_root)
 
-            self.indexer.remove_file(file_path, project_root)
+    def _find_project_root(self, file_path: Path) -> Path:
+        """
+        Find the project root (nearest ancestor containing .git) of a file
+
+        Args:
+            file_path: Path to the file
 
-    def _should_process_file(self, file_path: Path) -> bool:
+        Returns:
+            Project root, or the filesystem root if no .git was found
+        """
+        directory = file_path.parent
+        with self._root_cache_lock:
+            project_root = self._root_cache.get(directory)
+            if project_root is not None:
+                self._root_cache.move_to_end(directory)
+                return project_root
+
+        # Walk up, remembering every directory passed on the way so sibling
+        # and nested files resolve without touching the filesystem
+        visited = []
+        project_root = directory
+        while project_root.parent != project_root:
+            with self._root_cache_lock:
+                cached = self._root_cache.get(project_root)
+            if cached is not None:
+                project_root = cached
+                break
+            visited.append(project_root)
+            if (project_root / ".git").exists():
+                break
+            project_root = project_root.parent
+
+        with self._root_cache_lock:
+            for visited_dir in visited:
+                self._root_cache[visited_dir] = project_root
+                self._root_cache.move_to_end(visited_dir)
+            while len(self._root_cache) > self._root_cache_size:
+                self._root_cache.popitem(last=False)
+        return project_root
+
+    def _clear_root_cache(self):
+        """Forget cached project roots (a repository was created or removed)"""
+        with self._root_cache_lock:
+            self._root_cache.clear()
+
+    def _should_process_file(self, src_path: str) -> bool:
         """
         Check if file should be processed
 
+        Works on the raw event path: most events are rejected, and no Path
+        is built for them.
+
         Args:
-            file_path: Path to the file
+            src_path: Path to the file, as reported by watchdog
 
         Returns:
             True if file should be processed
         """
         # Check extension
-        if file_path.suffix not in settings.watch_extensions:
+        if not src_path.endswith(self._watch_extensions):
             return False
 
         # Check ignored directories
-        for ignored in settings.ignore_directories:
-            if ignored in file_path.parts:
-                return False
-
-        return True
+        return not any(fragment in src_path for fragment in self._ignored_fragments)
 
     def _add_pending_change(self, file_path: str):
         """
-        Add change with LRU eviction
+        Hand a change to the debounce task (called on watchdog's thread)
 
         Args:
             file_path: Path to file
         """
-        with self.lock:
-            if file_path in self.pending_changes:
-                # Move to end (most recent)
-                self.pending_changes.move_to_end(file_path)
-                self.pending_changes[file_path] = time.time()
+        if self._loop is None or self._queue is None:
+            return
+        try:
+            self._loop.call_soon_threadsafe(
+                self._queue.put_nowait, (file_path, time.monotonic())
+            )
+        except RuntimeError:
+            pass  # Event loop already closed
+
+    async def _debounce_changes(self):
+        """Process pending changes in debounced batches until cancelled"""
+        changes = self._queue
+        assert changes is not None
+        loop = asyncio.get_running_loop()
+        # Pending files -> last change time, ordered by last change (bounded
+        # with LRU eviction). They are processed together as one batch once
+        # no change has arrived for debounce_seconds, or once the batch's
+        # first change has waited max_delay.
+        pending: Dict[str, float] = {}
+        batch_start = 0.0
+        last_change = 0.0
+
+        while True:
+            # Sleep until the batch is due, or a change arrives
+            items = []
+            if pending:
+                due = min(
+                    last_change + self.debounce_seconds, batch_start + self.max_delay
+                )
+                timeout: Optional[float] = max(0.0, due - time.monotonic())
             else:
-                # Add new
-                self.pending_changes[file_path] = time.time()
-                self.change_event.set()
-
+                timeout = None
+            if timeout is None or timeout > 0:
+                try:
+                    items.append(await asyncio.wait_for(changes.get(), timeout=timeout))
+                except asyncio.TimeoutError:
+                    pass
+
+            # Take everything queued, coalescing repeated changes per file
+            while not changes.empty():
+                items.append(changes.get_nowait())
+
+            for file_path, timestamp in items:
+                if not pending:
+                    batch_start = timestamp
+                last_change = max(last_change, timestamp)
+                # Re-insert at the end (most recent)
+                pending.pop(file_path, None)
+                pending[file_path] = timestamp
                 # Evict oldest if over limit
-                if len(self.pending_changes) > self.max_pending:
-                    oldest_file, _ = self.pending_changes.popitem(last=False)
+                if len(pending) > self.max_pending:
+                    oldest_file = next(iter(pending))
+                    del pending[oldest_file]
                     logger.warning(f"Evicted oldest pending change: {oldest_file}")
 
-    def _process_pending_changes(self):
-        """Background thread to process pending changes with debouncing"""
-        while self.running:
-            # Wait for changes or timeout (to allow checking self.running)
-            # using a timeout allows us to check self.running periodically even if no events
-            if not self.pending_changes:
-                self.change_event.wait(timeout=1.0)
-                if not self.running:
-                    break
-                self.change_event.clear()
-            else:
-                time.sleep(
-                    0.1
-                )  # Check every 100ms when we have pending changes for debounce
+            current_time = time.monotonic()
+            if not pending or (
+                current_time - last_change < self.debounce_seconds
+                and current_time - batch_start < self.max_delay
+            ):
+                continue
+
+            files_to_process = list(pending)
+            pending.clear()
+
+            # Chunk the batch on worker threads (the indexer is blocking),
+            # then write all of it to the index at once
+            chunked = await asyncio.gather(
+                *(
+                    loop.run_in_executor(
+                        self._executor, self._chunk_changed_file, file_path
+                    )
+                    for file_path in files_to_process
+                )
+            )
+            files = dict(entry for entry in chunked if entry is not None)
+            indexed = await loop.run_in_executor(
+                self._executor, self._write_chunks, files
+            )
+            await self._broadcast_indexed(indexed)
 
-            current_time = time.time()
-            files_to_process = []
+    async def _broadcast_indexed(self, files: List[Dict]):
+        """
+        Broadcast one message for a batch of reindexed files
 
-            with self.lock:
-                # Find files that have been pending long enough
-                for file_path, timestamp in list(self.pending_changes.items()):
-                    if current_time - timestamp >= self.debounce_seconds:
-                        files_to_process.append(file_path)
-                        del self.pending_changes[file_path]
+        Args:
+            files: Results of _write_chunks for the batch
+        """
+        # Broadcast change via WebSocket if callback is set
+        if not (files and self.broadcast_callback):
+            return
 
-            # Process files outside the lock
-            for file_path in files_to_process:
-                self._reindex_file(file_path)
+        message = {
+            "type": "files_indexed",
+            "files": files,
+            "timestamp_ns": time.time_ns(),
+        }
+        try:
+            await self.broadcast_callback(message)
+        except Exception as e:
+            logger.error(f"Error broadcasting indexed files: {e}")
 
-    def _reindex_file(self, file_path: str):
+    def _chunk_changed_file(self, file_path: str) -> Optional[Tuple[str, ChunkBatch]]:
         """
-        Reindex a single file (runs in background thread)
+        Chunk a file for reindexing if its content changed (runs in background thread)
 
         Args:
             file_path: Path to the file to reindex
+
+        Returns:
+            (path relative to its project root, chunks), or None if there is
+            nothing to reindex
         """
+        relative_path = None
         try:
             path = Path(file_path)
             if not path.exists():
                 logger.warning(f"File no longer exists: {file_path}")
-                return
-
-            # Get project root (assuming we're watching from project root)
-            # This is simplified - in production you'd track the watched directory
-            project_root = path.parent
-            while project_root.parent != project_root:
-                if (project_root / ".git").exists():
-                    break
-                project_root = project_root.parent
-
-            # Reindex the file
-            chunks = self.indexer._chunk_file(path, project_root)
-            if not chunks:
-                return
-
-            self.indexer._add_chunks_to_index(chunks)
-            logger.info(f"Reindexed: {file_path} ({len(chunks)} chunks)")
-
-            # Broadcast change via WebSocket if callback is set
-            if not (self.broadcast_callback and self._loop):
-                return
-
-            message = {
-                "type": "file_indexed",
-                "path": str(path.relative_to(project_root)),
-                "chunks": len(chunks),
-                "timestamp": datetime.now().isoformat(),
-            }
-            # Schedule the coroutine in the event loop
-            asyncio.run_coroutine_threadsafe(
-                self.broadcast_callback(message), self._loop
-            )
+                return None
+
+            project_root = self._find_project_root(path)
+            relative_path = str(path.relative_to(project_root))
+
+            # Saves that leave the content unchanged need no reindex
+            if not self.indexer._update_file_hash(
+                path, relative_path, verify_content=True
+            ):
+                return None
+
+            return relative_path, self.indexer._chunk_file(path, project_root)
 
         except Exception as e:
             logger.error(f"Error reindexing {file_path}: {e}", exc_info=True)
+            if relative_path is not None:
+                # Not indexed: make sure the next change is not skipped
+                self.indexer._file_hashes.pop(relative_path, None)
+            return None
+
+    def _write_chunks(self, files: Dict[str, ChunkBatch]) -> List[Dict]:
+        """
+        Write a batch of chunked files to the index (runs in background thread)
+
+        Only chunks that changed are re-embedded.
+
+        Args:
+            files: Results of _chunk_changed_file for the batch
+
+        Returns:
+            {"path", "chunks"} of each indexed file, for the broadcast
+        """
+        if not files:
+            return []
+
+        try:
+            written = self.indexer._replace_files_chunks(files)
+        except Exception as e:
+            logger.error(f"Error reindexing {', '.join(files)}: {e}", exc_info=True)
+            # Not indexed: make sure the next change is not skipped
+            for relative_path in files:
+                self.indexer._file_hashes.pop(relative_path, None)
+            return []
+        finally:
+            self.indexer._schedule_save_file_hashes()
+
+        logger.info(f"Reindexed {len(files)} files ({written} chunks changed)")
+        return [
+            {"path": relative_path, "chunks": len(chunks)}
+            for relative_path, chunks in files.items()
+            if chunks
+        ]
 
     def stop(self):
-        """Stop the processor thread"""
-        if self.running:
-            self.running = False
-            self.change_event.set()  # Wake up thread so it can exit
-            if self.processor_thread and self.processor_thread.is_alive():
-                self.processor_thread.join(timeout=5)
-                if self.processor_thread.is_alive():
-                    logger.warning("Processor thread did not stop cleanly")
+        """Stop the debounce task and the reindex workers"""
+        task, self._debounce_task = self._debounce_task, None
+        if task is not None and self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(task.cancel)
+            except RuntimeError:
+                pass  # Event loop already closed
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        self._queue = None
 
     def __del__(self):
         """Ensure cleanup on garbage collection"""
@@ -239,7 +421,7 @@ class FileWatcherService:
             indexer: CodeIndexer instance to update on changes
         """
         self.indexer = indexer
-        self.observer = Observer()
+        self.observer = _create_observer()
         self.handler = CodeFileHandler(indexer)
         self.watching = False
         self.watched_path: Optional[Path] = None
@@ -262,10 +444,10 @@ class FileWatcherService:
             raise ValueError(f"Path does not exist: {path}")
 
         # Create a new Observer instance (observers can't be restarted after stop)
-        self.observer = Observer()
+        self.observer = _create_observer()
 
-        # Store event loop reference for async callback
-        self.handler._loop = asyncio.get_running_loop()
+        # Debounce changes on this event loop
+        await self.handler.start()
 
         # Set broadcast callback if provided
         if callback:
@@ -0,0 +1,205 @@
+"""
+Tests for GitService status, including the worktree-only refresh
+"""
+
+import os
+import subprocess
+import time
+from unittest.mock import Mock
+
+import pytest
+from watchdog.events import FileModifiedEvent, FileMovedEvent
+
+from services.git_service import GitService
+from services.git_watcher_service import GitChangeHandler
+
+
+def _git(repo_path, *args):
+    subprocess.run(["git", *args], cwd=repo_path, check=True, capture_output=True)
+
+
+def _entries(status):
+    return sorted((f.path, f.status, f.staged) for f in status.files)
+
+
+@pytest.fixture
+def git_test_repo(tmp_path):
+    """Create a temporary git repository with one tracked file"""
+    repo_path = tmp_path / "test_repo"
+    repo_path.mkdir()
+
+    _git(repo_path, "init")
+    _git(repo_path, "config", "user.name", "Test User")
+    _git(repo_path, "config", "user.email", "test@example.com")
+
+    (repo_path / "t.txt").write_text("original\n")
+    _git(repo_path, "add", "t.txt")
+    _git(repo_path, "commit", "-m", "Initial commit")
+
+    return repo_path
+
+
+def test_untracked_files_use_porcelain_code(git_test_repo):
+    """Untracked files are reported as "??" by the full status"""
+    (git_test_repo / "u1.txt").write_text("new\n")
+
+    status = GitService(str(git_test_repo)).get_status()
+
+    assert _entries(status) == [("u1.txt", "??", False)]
+
+
+def test_worktree_only_matches_full_status(git_test_repo):
+    """A worktree-only refresh agrees with a full status"""
+    (git_test_repo / "u1.txt").write_text("new\n")
+    (git_test_repo / "u2.txt").write_text("new\n")
+    (git_test_repo / "s.txt").write_text("staged\n")
+    _git(git_test_repo, "add", "s.txt")
+    service = GitService(str(git_test_repo))
+    previous = service.get_status()
+
+    (git_test_repo / "t.txt").write_text("edited\n")
+    (git_test_repo / "u3.txt").write_text("new\n")
+    status = service.get_status_worktree_only(previous, ["t.txt", "u3.txt"])
+
+    assert _entries(status) == _entries(GitService(str(git_test_repo)).get_status())
+    assert ("u1.txt", "??", False) in _entries(status)
+    assert ("u3.txt", "??", False) in _entries(status)
+
+
+def test_worktree_only_ignores_identical_rewrite(git_test_repo):
+    """Rewriting a file with the same bytes is not a modification"""
+    service = GitService(str(git_test_repo))
+    previous = service.get_status()
+
+    # Same bytes, newer mtime: the index's stat info is now stale
+    (git_test_repo / "t.txt").write_text("original\n")
+    later = time.time() + 10
+    os.utime(git_test_repo / "t.txt", (later, later))
+    status = service.get_status_worktree_only(previous, ["t.txt"])
+
+    assert status.is_clean
+    assert status.files == []
+
+
+def test_worktree_only_new_untracked_directory(git_test_repo):
+    """A file in a new directory is reported the way git status reports it"""
+    service = GitService(str(git_test_repo))
+    previous = service.get_status()
+
+    (git_test_repo / "newdir").mkdir()
+    (git_test_repo / "newdir" / "a.gd").write_text("new\n")
+    status = service.get_status_worktree_only(previous, ["newdir/a.gd"])
+
+    assert _entries(status) == [("newdir/", "??", False)]
+
+
+def test_worktree_only_change_in_untracked_directory(git_test_repo):
+    """Changes under a carried-over untracked directory add no duplicates"""
+    (git_test_repo / "newdir").mkdir()
+    (git_test_repo / "newdir" / "a.gd").write_text("new\n")
+    service = GitService(str(git_test_repo))
+    previous = service.get_status()
+
+    (git_test_repo / "newdir" / "b.gd").write_text("new\n")
+    status = service.get_status_worktree_only(previous, ["newdir/b.gd"])
+
+    assert _entries(status) == [("newdir/", "??", False)]
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        FileModifiedEvent(".git/HEAD"),
+        FileModifiedEvent(".git/packed-refs"),
+        FileMovedEvent(".git/refs/heads/main.lock", ".git/refs/heads/main"),
+        FileMovedEvent(".git/index.lock", ".git/index"),
+    ],
+)
+def test_ref_changes_invalidate_status(git_test_repo, event):
+    """HEAD and ref updates count as index changes, even without one"""
+    handler = GitChangeHandler(git_test_repo)
+    handler.git_service.get_status()
+    for attr in ("src_path", "dest_path"):
+        if getattr(event, attr):
+            setattr(event, attr, str(git_test_repo / getattr(event, attr)))
+
+    handler.on_any_event(event)
+
+    assert handler._dirty_classes == {"index"}
+    assert handler.git_service._status_dirty
+
+
+def test_lock_files_are_ignored(git_test_repo):
+    """Writing a .lock file alone is not a change"""
+    handler = GitChangeHandler(git_test_repo)
+    handler.git_service.get_status()
+
+    handler.on_any_event(FileModifiedEvent(str(git_test_repo / ".git/HEAD.lock")))
+
+    assert handler._dirty_classes == set()
+    assert not handler.git_service._status_dirty
+
+
+@pytest.mark.parametrize("path", [".gitignore", "sub/.gitignore", ".git/info/exclude"])
+def test_ignore_rule_changes_refresh_untracked_files(git_test_repo, path):
+    """Ignore files are index-class changes, so untracked files are re-checked"""
+    handler = GitChangeHandler(git_test_repo)
+    handler.git_service.get_status()
+
+    handler.on_any_event(FileModifiedEvent(str(git_test_repo / path)))
+
+    assert handler._dirty_classes == {"index"}
+
+
+@pytest.mark.asyncio
+async def test_failed_broadcast_forces_full_status(git_test_repo):
+    """After a failed refresh the next broadcast does not reuse the snapshot"""
+    handler = GitChangeHandler(git_test_repo)
+    handler.git_service.get_status()
+    handler.broadcast_callback = Mock()
+    handler._last_snapshot = handler.git_service.get_status()
+
+    def fail(previous, changed_paths):
+        raise RuntimeError("git failed")
+
+    handler.git_service.get_status_worktree_only = fail
+    await handler._broadcast_git_status({"worktree"}, {"t.txt"})
+
+    assert handler._last_snapshot is None
+
+
+def test_log_keeps_multiline_messages(git_test_repo):
+    """Commit bodies spanning several lines come back whole, newest first"""
+    (git_test_repo / "t.txt").write_text("edited\n")
+    _git(git_test_repo, "commit", "-am", "Subject line\n\nFirst body line\nSecond")
+
+    log = GitService(str(git_test_repo)).get_log()
+
+    assert [c.message for c in log] == [
+        "Subject line\n\nFirst body line\nSecond",
+        "Initial commit",
+    ]
+    head = subprocess.run(
+        ["git", "rev-parse", "HEAD"], cwd=git_test_repo, capture_output=True, text=True
+    ).stdout.strip()
+    assert log[0].hash == head
+    assert log[0].author == "Test User <test@example.com>"
+    assert log[0].short_hash == log[0].hash[:7]
+
+
+def test_log_message_may_contain_separators(git_test_repo):
+    """A field separator inside a message does not split the record"""
+    message = "Odd\x1fsubject\n\nbody\x1fwith\x1f separators"
+    (git_test_repo / "t.txt").write_text("edited\n")
+    _git(git_test_repo, "commit", "-am", message)
+
+    log = GitService(str(git_test_repo)).get_log(max_count=1)
+
+    assert [c.message for c in log] == [message]
+
+
+def test_log_of_empty_repository(tmp_path):
+    """A repository without commits has an empty log"""
+    _git(tmp_path, "init")
+
+    assert GitService(str(tmp_path)).get_log() == []
@@ -0,0 +1,396 @@
+"""
+Tests for CodeIndexer chunking and incremental index updates
+"""
+
+import json
+import logging
+import random
+import re
+import threading
+from pathlib import Path
+
+import pytest
+
+from services.indexer_service import ChunkBatch, CodeIndexer
+
+PROJECT_ROOT = Path("/project")
+
+
+@pytest.fixture
+def chunker():
+    """Indexer used only for chunking (no ChromaDB client)"""
+    return CodeIndexer.__new__(CodeIndexer)
+
+
+@pytest.mark.parametrize(
+    "file_name, source",
+    [
+        ("vec2.cpp", "struct Vec2 { Vec2() {} float x; };\n"),
+        ("foo.cs", "class Foo { public Foo() {} }\n"),
+    ],
+)
+def test_class_and_constructor_ids_differ(chunker, file_name, source):
+    """A class and its same-line constructor get distinct chunk IDs"""
+    pytest.importorskip("tree_sitter_languages")
+
+    chunks = chunker._chunk_content(source, PROJECT_ROOT / file_name, PROJECT_ROOT)
+
+    assert len(chunks) == 2
+    assert len(set(chunks.ids)) == 2
+
+
+# The separate function/class scans the multiline chunker replaced
+REFERENCE_PATTERNS = {
+    ".gd": (
+        ("function", r"^(func\s+(\w+)\s*\([^)]*\):.*?)(?=^func\s+|\Z)"),
+        ("class", r"^(class\s+(\w+)\s*:.*?)(?=^class\s+|\Z)"),
+    ),
+    ".py": (
+        ("function", r"^(def\s+(\w+)\s*\([^)]*\):.*?)(?=^def\s+|^class\s+|\Z)"),
+        ("class", r"^(class\s+(\w+).*?)(?=^class\s+|\Z)"),
+    ),
+    ".cpp": (
+        ("function", r"^(\w+\s+(\w+)\s*\([^)]*\)\s*\{(?:[^{}]|\{[^{}]*\})*\})"),
+        ("class", r"^(class\s+(\w+).*?\{(?:[^{}]|\{[^{}]*\})*\};)"),
+    ),
+}
+
+FRAGMENTS = {
+    ".gd": [
+        "func a():\n",
+        "func b(x, y):\n",
+        "func c() -> void:\n",
+        "\tpass\n",
+        "\tvar v = 1\n",
+        "class Inner:\n",
+        "class Broken\n",
+        "extends Node\n",
+        "\n",
+        "# func d():\n",
+    ],
+    ".py": [
+        "def a():\n",
+        "def b(x,\n      y):\n",
+        "    return 1\n",
+        "class A:\n",
+        "class B(Base):\n",
+        "    def m(self):\n",
+        "async def c():\n",
+        "\n",
+        "x = 1\n",
+    ],
+    ".cpp": [
+        "class Foo;\n",
+        "class Bar {\n",
+        "};\n",
+        "int main() {\n",
+        "void f(int x) { return; }\n",
+        "  if (x) { y(); }\n",
+        "}\n",
+        "{\n",
+        "static int g(void)\n{\n",
+        "\n",
+        "int x = 0;\n",
+    ],
+}
+
+
+def _reference_chunks(content, suffix):
+    chunks = []
+    for chunk_type, pattern in REFERENCE_PATTERNS[suffix]:
+        for match in re.finditer(pattern, content, re.MULTILINE | re.DOTALL):
+            line_start = content[: match.start(1)].count("\n") + 1
+            line_end = line_start + match.group(1).count("\n")
+            chunks.append(
+                (
+                    chunk_type,
+                    match.group(2),
+                    line_start,
+                    line_end,
+                    match.group(1).strip(),
+                )
+            )
+    return chunks
+
+
+@pytest.mark.parametrize("suffix", sorted(FRAGMENTS))
+def test_multiline_chunker_matches_separate_scans(chunker, suffix):
+    """The multiline chunker finds exactly what separate scans found"""
+    rng = random.Random(suffix)
+    file_path = PROJECT_ROOT / f"file{suffix}"
+    for _ in range(500):
+        content = "".join(rng.choices(FRAGMENTS[suffix], k=rng.randint(0, 30)))
+
+        chunks = chunker._process_file_content_multiline(
+            content, file_path, PROJECT_ROOT
+        )
+
+        found = [
+            (m["chunk_type"], m["name"], m["line_start"], m["line_end"], document)
+            for m, document in zip(chunks.metadatas, chunks.documents)
+        ]
+        assert found == _reference_chunks(content, suffix), content
+
+
+LINE_FRAGMENTS = [
+    "public void Foo(int a)",
+    "class Bar",
+    "  private static int baz()",
+    "int x(int y) {",
+    "    body();",
+    "\tx++;",
+    "",
+    "   ",
+    "}",
+    "other",
+    "int f(int a);",
+    "  class Q",
+    "func g():",
+    "public class Z",
+    "\r",
+    "int q(\n) {",
+    "class C:",
+    "\tfunc m():",
+]
+
+
+def _reference_line_chunks(content, suffix):
+    """The per-line loop the line chunker replaced"""
+    patterns = CodeIndexer.PATTERNS[suffix]
+    lines = content.split("\n")
+    chunks = []
+    current = None  # (chunk_type, name, first line, lines)
+
+    def close(last):
+        chunk_type, name, first, chunk_lines = current
+        chunks.append((chunk_type, name, first + 1, last + 1, "\n".join(chunk_lines)))
+
+    for i, line in enumerate(lines):
+        header = None
+        for chunk_type in ("function", "class"):
+            match = patterns[chunk_type].match(line)
+            if match:
+                header = (chunk_type, match.group(1))
+                break
+        if header:
+            # A chunk cut short by the next header ends on the line before it
+            if current:
+                close(i - 1)
+            current = (*header, i, [line])
+            continue
+
+        if current:
+            current[3].append(line)
+            if not line.strip() or (
+                len(current[3]) > 5 and not line.startswith((" ", "\t"))
+            ):
+                close(i)
+                current = None
+
+    if current:
+        close(len(lines) - 1)
+    return chunks
+
+
+@pytest.mark.parametrize("suffix", sorted(CodeIndexer.PATTERNS))
+def test_line_chunker_matches_per_line_loop(chunker, suffix):
+    """One finditer pass over the file finds what matching each line found"""
+    rng = random.Random(suffix)
+    file_path = PROJECT_ROOT / f"file{suffix}"
+    for _ in range(1000):
+        content = "\n".join(rng.choices(LINE_FRAGMENTS, k=rng.randint(0, 25)))
+
+        chunks = chunker._process_file_content(content, file_path, PROJECT_ROOT)
+
+        found = [
+            (m["chunk_type"], m["name"], m["line_start"], m["line_end"], document)
+            for m, document in zip(chunks.metadatas, chunks.documents)
+        ]
+        assert found == _reference_line_chunks(content, suffix), content
+
+
+class FakeCollection:
+    """In-memory stand-in for the parts of a ChromaDB collection used here"""
+
+    def __init__(self):
+        self.rows = {}  # id -> (document, metadata)
+        self.upserted = []
+        self.deleted = []
+
+    def get(self, where, include):
+        file_path = where["file_path"]
+        paths = file_path["$in"] if isinstance(file_path, dict) else [file_path]
+        ids = [i for i, (_, meta) in self.rows.items() if meta["file_path"] in paths]
+        return {"ids": ids, "documents": [self.rows[i][0] for i in ids]}
+
+    def upsert(self, documents, embeddings, metadatas, ids):
+        assert len(embeddings) == len(ids) == len(set(ids))
+        self.upserted.append(list(ids))
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            self.rows[chunk_id] = (document, metadata)
+
+    def add(self, documents, embeddings, metadatas, ids):
+        self.upsert(documents, embeddings, metadatas, ids)
+
+    def delete(self, ids):
+        self.deleted.append(sorted(ids))
+        for chunk_id in ids:
+            del self.rows[chunk_id]
+
+
+@pytest.fixture
+def indexer():
+    """Indexer writing to a FakeCollection, counting embedded documents"""
+    indexer = CodeIndexer.__new__(CodeIndexer)
+    indexer.client = None
+    indexer.collection = FakeCollection()
+    indexer._reusable_embeddings = None
+    indexer._pending = ChunkBatch()
+    indexer._pending_lock = threading.Lock()
+    indexer._file_hashes = {}
+    indexer.embedded = []
+
+    def embed(documents):
+        indexer.embedded.extend(documents)
+        return [[0.0] for _ in documents]
+
+    indexer.embedding_function = embed
+    return indexer
+
+
+def _chunks(indexer, file_name, source):
+    return indexer._chunk_content(source, PROJECT_ROOT / file_name, PROJECT_ROOT)
+
+
+def test_replace_files_chunks_writes_only_changes(indexer):
+    """Unchanged chunks are kept, changed ones re-embedded, stale ones deleted"""
+    a_source = "func a():\n\tpass\n\nfunc b(x):\n\treturn x\n"
+    b_source = "func c():\n\tpass\n"
+    written = indexer._replace_files_chunks(
+        {
+            "a.gd": _chunks(indexer, "a.gd", a_source),
+            "b.gd": _chunks(indexer, "b.gd", b_source),
+        }
+    )
+    assert written == 3
+    assert len(indexer.collection.upserted) == 1
+
+    indexer.embedded.clear()
+    written = indexer._replace_files_chunks(
+        {
+            "a.gd": _chunks(
+                indexer, "a.gd", "func a():\n\tpass\n\nfunc b(x):\n\treturn 1\n"
+            ),
+            "b.gd": _chunks(indexer, "b.gd", "extends Node\n"),
+        }
+    )
+
+    assert written == 2
+    assert indexer.embedded == ["func b(x):\n\treturn 1", "extends Node\n"]
+    assert len(indexer.collection.deleted) == 1
+    names = sorted(meta["name"] for _, meta in indexer.collection.rows.values())
+    assert names == ["a", "b", "b.gd"]
+
+
+def test_replace_files_chunks_unchanged_is_noop(indexer):
+    """Reindexing identical content neither embeds nor writes"""
+    files = {"a.gd": _chunks(indexer, "a.gd", "func a():\n\tpass\n")}
+    indexer._replace_files_chunks(files)
+    indexer.embedded.clear()
+
+    assert indexer._replace_files_chunks(files) == 0
+    assert indexer.embedded == []
+    assert len(indexer.collection.upserted) == 1
+    assert indexer.collection.deleted == []
+    assert indexer._replace_files_chunks({}) == 0
+
+
+def test_failed_batch_is_reported_against_its_files(indexer, tmp_path, caplog):
+    """A failed batch write costs only that batch's files, and names them all"""
+    for name in ("a", "b", "c"):
+        (tmp_path / f"{name}.gd").write_text(f"func {name}():\n\tpass\n")
+    indexer.BATCH_SIZE = 2
+    add = indexer.collection.add
+    calls = []
+
+    def add_failing_first(**batch):
+        calls.append(batch["metadatas"])
+        if len(calls) == 1:
+            raise RuntimeError("disk full")
+        add(**batch)
+
+    indexer.collection.add = add_failing_first
+    with caplog.at_level(logging.ERROR):
+        files_indexed, chunks_created = indexer.index_project(str(tmp_path))
+
+    assert (files_indexed, chunks_created) == (1, 1)
+    failed = sorted(m["file_path"] for m in calls[0])
+    assert len(failed) == 2
+    assert all(path in caplog.text for path in failed)
+    assert len(indexer.collection.rows) == 1
+
+
+@pytest.fixture
+def hash_cache(tmp_path):
+    """Indexer with only its file hash cache, persisted under tmp_path"""
+
+    def make():
+        indexer = CodeIndexer.__new__(CodeIndexer)
+        indexer.persist_directory = tmp_path
+        indexer._file_hashes = {}
+        indexer._hashes_lock = threading.Lock()
+        indexer._hashes_save_timer = None
+        return indexer
+
+    return make
+
+
+def test_file_hashes_round_trip(hash_cache):
+    """Saved hashes load back unchanged"""
+    hashes = {
+        "a.gd": {"size": 12, "mtime_ns": 1_700_000_000_123_456_789, "xxh3": "ab12"},
+        "sub/b.cs": {"size": 0, "mtime_ns": 1},
+    }
+    indexer = hash_cache()
+    indexer._file_hashes.update(hashes)
+    indexer._save_file_hashes()
+
+    loaded = hash_cache()
+    loaded._load_file_hashes()
+
+    assert loaded._file_hashes == hashes
+
+
+def test_legacy_json_file_hashes_load(hash_cache, tmp_path):
+    """The old JSON cache still loads; bare SHA-256 entries are dropped"""
+    entry = {"size": 3, "mtime_ns": 42, "xxh3": "ff"}
+    (tmp_path / "file_hashes.json").write_text(
+        json.dumps({"a.gd": entry, "old.gd": "e3b0c442" * 8})
+    )
+
+    indexer = hash_cache()
+    indexer._load_file_hashes()
+
+    assert indexer._file_hashes == {"a.gd": entry}
+
+
+def test_hash_saves_are_coalesced(hash_cache, tmp_path):
+    """A burst of scheduled saves writes the cache once, after the delay"""
+    indexer = hash_cache()
+    indexer.HASH_SAVE_DELAY = 0.05
+    indexer._file_hashes["a.gd"] = {"size": 1, "mtime_ns": 1}
+
+    indexer._schedule_save_file_hashes()
+    timer = indexer._hashes_save_timer
+    indexer._file_hashes["b.gd"] = {"size": 2, "mtime_ns": 2}
+    indexer._schedule_save_file_hashes()
+
+    assert indexer._hashes_save_timer is timer
+    assert not (tmp_path / "file_hashes.msgpack").exists()
+
+    timer.join(1)
+    loaded = hash_cache()
+    loaded._load_file_hashes()
+
+    assert indexer._hashes_save_timer is None
+    assert sorted(loaded._file_hashes) == ["a.gd", "b.gd"]
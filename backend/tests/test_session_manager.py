@@ -0,0 +1,96 @@
+"""
+Tests for SessionManager expiry and eviction
+"""
+
+import pytest
+
+from services import session_manager
+from services.session_manager import SessionManager
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for time.monotonic_ns"""
+
+    class Clock:
+        now = 0
+
+        def advance(self, seconds):
+            self.now += int(seconds * 1_000_000_000)
+
+    clock = Clock()
+    monkeypatch.setattr(session_manager.time, "monotonic_ns", lambda: clock.now)
+    return clock
+
+
+def test_cached_status_expires_after_ttl(clock):
+    """A session is dropped once it has not been updated for SESSION_TTL"""
+    manager = SessionManager()
+    manager.update_cache("a", "status-a")
+
+    clock.advance(SessionManager.SESSION_TTL)
+    assert manager.get_cached_status("a") == "status-a"
+
+    clock.advance(1)
+    assert manager.get_cached_status("a") is None
+    assert manager.get_session_count() == 0
+
+
+def test_update_refreshes_ttl(clock):
+    """Updating a session restarts its TTL"""
+    manager = SessionManager()
+    manager.update_cache("a", "status-a")
+    clock.advance(SessionManager.SESSION_TTL - 1)
+    manager.update_cache("a", "status-a2")
+    clock.advance(SessionManager.SESSION_TTL - 1)
+
+    assert manager.get_cached_status("a") == "status-a2"
+
+
+def test_cleanup_expired_removes_only_expired(clock):
+    """cleanup_expired removes stale sessions and keeps live ones"""
+    manager = SessionManager()
+    manager.update_cache("old", "status")
+    manager.update_cache("refreshed", "status")
+    clock.advance(SessionManager.SESSION_TTL - 10)
+    manager.update_cache("new", "status")
+    manager.update_cache("refreshed", "status")
+    clock.advance(20)
+
+    assert manager.cleanup_expired() == 1
+    assert manager.get_cached_status("old") is None
+    assert manager.get_cached_status("refreshed") == "status"
+    assert manager.get_cached_status("new") == "status"
+
+
+def test_evicts_least_recently_updated_at_limit(clock, monkeypatch):
+    """At MAX_SESSIONS, the least recently updated session is evicted"""
+    monkeypatch.setattr(SessionManager, "MAX_SESSIONS", 3)
+    manager = SessionManager()
+    for client_id in ("a", "b", "c"):
+        manager.update_cache(client_id, f"status-{client_id}")
+        clock.advance(1)
+    manager.update_cache("a", "status-a")
+
+    manager.update_cache("d", "status-d")
+
+    assert manager.get_session_count() == 3
+    assert manager.get_cached_status("b") is None
+    for client_id in ("a", "c", "d"):
+        assert manager.get_cached_status(client_id) == f"status-{client_id}"
+
+
+def test_expired_sessions_are_dropped_before_evicting(clock, monkeypatch):
+    """Reaching the limit first frees expired sessions"""
+    monkeypatch.setattr(SessionManager, "MAX_SESSIONS", 3)
+    manager = SessionManager()
+    manager.update_cache("a", "status-a")
+    manager.update_cache("b", "status-b")
+    clock.advance(SessionManager.SESSION_TTL + 1)
+    manager.update_cache("c", "status-c")
+
+    manager.update_cache("d", "status-d")
+
+    assert manager.get_session_count() == 2
+    assert manager.get_cached_status("c") == "status-c"
+    assert manager.get_cached_status("d") == "status-d"
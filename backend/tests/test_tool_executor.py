@@ -0,0 +1,93 @@
+"""
+Tests for ToolExecutor.execute_tools scheduling
+"""
+
+import asyncio
+
+import pytest
+
+from services.tool_executor import ToolExecutor
+
+
+@pytest.fixture
+def executor():
+    """Executor whose tool calls only log when they start and end"""
+    executor = ToolExecutor()
+    executor.events = []
+
+    async def execute_tool(tool_name, tool_input):
+        executor.events.append(("start", tool_input["n"]))
+        await asyncio.sleep(0.01)
+        executor.events.append(("end", tool_input["n"]))
+        if tool_name == "godot_fail":
+            raise RuntimeError("editor error")
+        return {"success": True, "n": tool_input["n"]}
+
+    executor.execute_tool = execute_tool
+    return executor
+
+
+def _calls(*names):
+    return [
+        {"name": name, "id": f"call_{n}", "input": {"n": n}}
+        for n, name in enumerate(names)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_reads_run_together_and_modifications_alone(executor):
+    """Consecutive reads overlap; a modification waits for and blocks them"""
+    results = await executor.execute_tools(
+        _calls(
+            "godot_get_selection",
+            "godot_get_scene_tree",
+            "godot_create_node",
+            "godot_get_property",
+            "godot_get_selection",
+        )
+    )
+
+    assert executor.events == [
+        ("start", 0),
+        ("start", 1),
+        ("end", 0),
+        ("end", 1),
+        ("start", 2),
+        ("end", 2),
+        ("start", 3),
+        ("start", 4),
+        ("end", 3),
+        ("end", 4),
+    ]
+    assert [r["tool_use_id"] for r in results] == [f"call_{n}" for n in range(5)]
+    assert [r["result"]["n"] for r in results] == list(range(5))
+
+
+@pytest.mark.asyncio
+async def test_consecutive_modifications_run_in_order(executor):
+    """Modifying calls never overlap each other"""
+    await executor.execute_tools(
+        _calls("godot_create_node", "godot_set_property", "godot_delete_node")
+    )
+
+    assert executor.events == [
+        ("start", 0),
+        ("end", 0),
+        ("start", 1),
+        ("end", 1),
+        ("start", 2),
+        ("end", 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_failed_call_does_not_stop_the_rest(executor):
+    """An exception becomes that call's error result"""
+    results = await executor.execute_tools(
+        _calls("godot_get_selection", "godot_fail", "godot_get_selection")
+    )
+
+    assert results[0]["result"] == {"success": True, "n": 0}
+    assert results[1]["tool_name"] == "godot_fail"
+    assert "editor error" in results[1]["result"]["error"]
+    assert results[2]["result"] == {"success": True, "n": 2}
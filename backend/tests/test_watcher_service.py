@@ -0,0 +1,77 @@
+"""
+Tests for the file watcher's debounced reindex batches
+"""
+
+import asyncio
+import contextlib
+import time
+from unittest.mock import Mock
+
+import pytest
+import pytest_asyncio
+
+from services.indexer_service import ChunkBatch
+from services.watcher_service import CodeFileHandler
+
+
+@pytest_asyncio.fixture
+async def handler():
+    """File handler whose reindex steps only record the batches they get"""
+    handler = CodeFileHandler(Mock(), debounce_seconds=0.1, max_delay=0.4)
+    handler.batches = []
+    handler._chunk_changed_file = lambda path: (path, ChunkBatch())
+
+    def write_chunks(files):
+        handler.batches.append((time.monotonic(), sorted(files)))
+        return []
+
+    handler._write_chunks = write_chunks
+    await handler.start()
+    yield handler
+
+    task = handler._debounce_task
+    handler.stop()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+
+
+@pytest.mark.asyncio
+async def test_burst_is_one_batch(handler):
+    """Files saved in quick succession are reindexed together"""
+    paths = [f"/project/file_{i}.gd" for i in range(40)]
+    for path in paths:
+        handler._add_pending_change(path)
+        await asyncio.sleep(0.002)
+
+    await asyncio.sleep(0.3)
+
+    assert [files for _, files in handler.batches] == [sorted(paths)]
+
+
+@pytest.mark.asyncio
+async def test_repeated_changes_are_coalesced(handler):
+    """A file changed several times in a burst is reindexed once"""
+    for _ in range(5):
+        handler._add_pending_change("/project/a.gd")
+        handler._add_pending_change("/project/b.gd")
+        await asyncio.sleep(0.01)
+
+    await asyncio.sleep(0.3)
+
+    assert [files for _, files in handler.batches] == [
+        ["/project/a.gd", "/project/b.gd"]
+    ]
+
+
+@pytest.mark.asyncio
+async def test_max_delay_bounds_continuous_changes(handler):
+    """Changes that never go quiet are still processed after max_delay"""
+    start = time.monotonic()
+    while time.monotonic() - start < 0.7:
+        handler._add_pending_change("/project/a.gd")
+        await asyncio.sleep(0.02)
+
+    assert handler.batches
+    first_batch_time, files = handler.batches[0]
+    assert files == ["/project/a.gd"]
+    assert 0.35 <= first_batch_time - start < 0.6
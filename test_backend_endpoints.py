@@ -7,10 +7,13 @@ import json
 
 BASE_URL = "http://127.0.0.1:8005"
 
+# One session so every request reuses the same keep-alive connection
+SESSION = requests.Session()
+
 def test_git_status():
     """Test GET /git/status"""
     print("\n=== Testing GET /git/status ===")
-    response = requests.get(f"{BASE_URL}/git/status")
+    response = SESSION.get(f"{BASE_URL}/git/status")
     print(f"Status Code: {response.status_code}")
 
     if response.status_code == 200:
@@ -30,7 +33,7 @@ def test_git_add():
     print("\n=== Testing POST /git/add ===")
 
     # First get status to find a file to stage
-    status_response = requests.get(f"{BASE_URL}/git/status")
+    status_response = SESSION.get(f"{BASE_URL}/git/status")
     if status_response.status_code != 200:
         print("Cannot get status, skipping add test")
         return
@@ -45,7 +48,7 @@ def test_git_add():
     test_file = unstaged_files[0]['path']
     print(f"Staging file: {test_file}")
 
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/git/add",
         json={"files": [test_file]}
     )
@@ -63,7 +66,7 @@ def test_ai_commit_message():
     print("\n=== Testing POST /ai/generate/commit-message ===")
 
     # Get staged files
-    status_response = requests.get(f"{BASE_URL}/git/status")
+    status_response = SESSION.get(f"{BASE_URL}/git/status")
     if status_response.status_code != 200:
         print("Cannot get status, skipping AI test")
         return
@@ -77,7 +80,7 @@ def test_ai_commit_message():
 
     print(f"Generating commit message for {len(staged_files)} files")
 
-    response = requests.post(
+    response = SESSION.post(
         f"{BASE_URL}/ai/generate/commit-message",
         json={
             "staged_files": staged_files,
@@ -100,7 +103,7 @@ def main():
     try:
         # Test basic connectivity
         print("\n=== Testing Server Connectivity ===")
-        response = requests.get(f"{BASE_URL}/health", timeout=5)
+        response = SESSION.get(f"{BASE_URL}/health", timeout=5)
         print(f"Health Check: {response.status_code}")
     except requests.exceptions.ConnectionError:
         print("ERROR: Cannot connect to backend server!")
@@ -117,4 +120,5 @@ def main():
     print("\n=== Tests Complete ===")
 
 if __name__ == "__main__":
-    main()
+    with SESSION:
+        main()